@@ -13,11 +13,6 @@ import sys
 import argparse
 from pathlib import Path
 
-from dotenv import load_dotenv
-load_dotenv()
-
-from rlm.agent import RLMAgent
-
 
 def main():
     parser = argparse.ArgumentParser(
@@ -94,6 +89,19 @@ Examples:
         help="Maximum conversation turns (default: 15)"
     )
     
+    parser.add_argument(
+        "--max-history",
+        type=int,
+        default=8,
+        help="Recent messages kept in the prompt, 0 keeps all, otherwise at least 2 (default: 8)"
+    )
+    
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream model responses as they are generated"
+    )
+    
     parser.add_argument(
         "--quiet", "-q",
         action="store_true",
@@ -108,6 +116,10 @@ Examples:
     
     args = parser.parse_args()
     
+    # Deferred until after argument parsing so --help stays fast
+    from dotenv import load_dotenv
+    load_dotenv()
+    
     # Validate inputs
     if not args.build_only:
         if args.directory is None and args.file is None:
@@ -117,6 +129,10 @@ Examples:
         if args.directory and args.file:
             print("Error: Provide either file or --directory, not both", file=sys.stderr)
             sys.exit(1)
+        
+        if args.max_history != 0 and args.max_history < 2:
+            print("Error: --max-history must be 0 (keep all) or at least 2", file=sys.stderr)
+            sys.exit(1)
     
     # Check API key
     api_key = os.environ.get("OPENROUTER_API_KEY")
@@ -137,10 +153,13 @@ Examples:
             sys.exit(1)
     
     # Create agent
+    from rlm.agent import RLMAgent
     agent = RLMAgent(
         api_key=api_key,
         model=args.model,
         max_turns=args.max_turns,
+        max_history=args.max_history,
+        stream=args.stream,
         verbose=not args.quiet,
         remote_url=args.remote,
         remote_api_key=args.remote_key
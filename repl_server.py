@@ -11,29 +11,97 @@ This server provides:
 
 import sys
 import os
-import io
 import json
-import traceback
 import glob
 import fnmatch
+import posixpath
 import re
+import time
+import asyncio
+import hashlib
+import mmap
+import threading
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-from contextlib import redirect_stdout, redirect_stderr
+from typing import Dict, List, Optional, Any, Tuple, Union, Callable
 
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
 from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, FileResponse
+import anyio
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 import uvicorn
 
+from rlm.execution import run_code
+
 # ============================================================================
 # Configuration
 # ============================================================================
 
-MAX_OUTPUT_SIZE = 50000  # characters
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB per file
+READ_BUFFER_SIZE = 1024 * 1024  # 1MB read buffer for file access
+GZIP_MIN_SIZE = 1000  # bytes; smaller responses are not worth compressing
+MMAP_MIN_SIZE = 1024 * 1024  # memory-map context files at least this big
 DATA_DIR = "/mnt/data"
+CONTEXT_FILE = os.path.join(DATA_DIR, "input.txt")  # single-file mode mount
 API_KEY = os.environ.get("RLM_API_KEY", "")  # Optional auth
+LLM_CACHE_SIZE = int(os.environ.get("RLM_LLM_CACHE_SIZE", "256"))  # entries, 0 disables
+LLM_CACHE_TTL = float(os.environ.get("RLM_LLM_CACHE_TTL", "3600"))  # seconds
+MAX_RECURSION_DEPTH = int(os.environ.get("RLM_MAX_RECURSION_DEPTH", "3"))
+LLM_QUERY_CONCURRENCY = int(os.environ.get("RLM_LLM_QUERY_CONCURRENCY", "8"))
+FILE_IO_WORKERS = int(os.environ.get("RLM_FILE_IO_WORKERS", "8"))
+MAX_SEARCH_MATCHES = 100
+BINARY_SNIFF_SIZE = 512  # bytes read to detect binary files
+THREADPOOL_SIZE = int(os.environ.get("RLM_THREADPOOL_SIZE", "0"))  # 0 keeps anyio's default
+INDEX_WAIT_TIMEOUT = float(os.environ.get("RLM_INDEX_WAIT_TIMEOUT", "120"))  # seconds
+REGEX_SPECIAL_CHARS = frozenset('.^$*+?{}[]\\|()')
+
+# File extension -> type label used in the file index
+EXT_FILE_TYPES: Dict[str, str] = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.ts': 'typescript',
+    '.jsx': 'react',
+    '.tsx': 'react',
+    '.java': 'java',
+    '.c': 'c',
+    '.cpp': 'cpp',
+    '.h': 'header',
+    '.go': 'go',
+    '.rs': 'rust',
+    '.rb': 'ruby',
+    '.php': 'php',
+    '.md': 'markdown',
+    '.txt': 'text',
+    '.json': 'json',
+    '.yaml': 'yaml',
+    '.yml': 'yaml',
+    '.xml': 'xml',
+    '.html': 'html',
+    '.css': 'css',
+    '.sql': 'sql',
+    '.sh': 'shell',
+}
+
+# Control bytes that do not appear in text (everything except \t \n \f \r \b, ESC)
+_BINARY_CONTROL_BYTES = bytes(set(range(32)) - {8, 9, 10, 12, 13, 27}) + b'\x7f'
+
+# Directories never descended into while indexing (hidden ones such as
+# .git and .venv are already skipped by the leading-dot rule). More names
+# can be added with RLM_EXTRA_IGNORED_DIRS, e.g. "env,site-packages".
+IGNORED_DIRS = frozenset({'__pycache__', 'node_modules', 'venv', '__MACOSX'}) | frozenset(
+    name.strip() for name in os.environ.get("RLM_EXTRA_IGNORED_DIRS", "").split(',')
+    if name.strip()
+)
+
 
 # ============================================================================
 # Global State
@@ -42,17 +110,70 @@ API_KEY = os.environ.get("RLM_API_KEY", "")  # Optional auth
 # Persistent namespace for code execution
 global_namespace: Dict[str, Any] = {}
 
+# Serializes execute_code: stdout/stderr redirection is process-wide and
+# snippets must see each other's namespace changes in order
+_execution_lock = threading.Lock()
+
 # File index: path -> metadata
 file_index: Dict[str, Dict] = {}
 
+# Nested directory view of file_index, rebuilt on every index
+file_tree: Dict = {}
+
+# Sorted keys of file_index, rebuilt on every index
+sorted_paths: List[str] = []
+
+# Root of the last index and its path -> (size, mtime_ns) signatures,
+# used to reuse unchanged entries on reindex
+_index_root: Optional[str] = None
+_index_signatures: Dict[str, Tuple[int, int]] = {}
+
+# Set once the startup index and namespace are built; requests that need
+# them wait on it while /status answers immediately
+_index_ready = asyncio.Event()
+# Startup build task (held so it isn't garbage collected mid-run) and the
+# error it failed with, if any
+_index_task: Optional["asyncio.Task[None]"] = None
+_index_error: Optional[str] = None
+
+# llm_query response cache: key -> (timestamp, response), in LRU order
+_llm_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_llm_cache_lock = threading.Lock()
+llm_cache_stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+# Shared HTTP session so sub-queries reuse TLS connections to OpenRouter;
+# the pool is sized for llm_query_many fan-out
+_llm_session = requests.Session()
+_llm_session.headers.update({
+    "HTTP-Referer": "https://github.com/rlm-engine",
+    "X-Title": "RLM Engine Sub-Query"
+})
+_llm_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=max(LLM_QUERY_CONCURRENCY, 10)
+))
+
+# llm_query nesting depth for the current execution context
+_recursion_depth: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "rlm_recursion_depth",
+    default=int(os.environ.get("RLM_RECURSION_DEPTH", "0"))
+)
+
 # ============================================================================
 # Helper Functions (exposed to LLM-generated code)
 # ============================================================================
 
 def log(message: str):
-    """Log to stderr."""
-    sys.stderr.write(f"[RLM] {message}\n")
-    sys.stderr.flush()
+    """
+    Log to the process's real stderr.
+    
+    Code runs in worker threads under redirect_stderr(), which swaps
+    sys.stderr for the whole process; writing to sys.__stderr__ keeps
+    log lines from other requests out of a running snippet's output.
+    """
+    stream = sys.__stderr__ or sys.stderr
+    stream.write(f"[RLM] {message}\n")
+    stream.flush()
 
 
 def list_files(pattern: str = "*") -> List[str]:
@@ -65,21 +186,16 @@ def list_files(pattern: str = "*") -> List[str]:
     Returns:
         List of file paths
     """
-    all_files = list(file_index.keys())
     if pattern == "*":
-        return sorted(all_files)
-    return sorted([f for f in all_files if fnmatch.fnmatch(f, pattern)])
+        return list(sorted_paths)
+    regex = _compile_regex(fnmatch.translate(pattern))
+    return [f for f in sorted_paths if regex.match(f)]
 
 
-def get_file_tree() -> Dict:
-    """
-    Get the file tree with metadata.
-    
-    Returns:
-        Nested dict representing directory structure
-    """
+def _build_file_tree(index: Dict[str, Dict]) -> Dict:
+    """Build the nested directory structure for a file index."""
     tree = {}
-    for path, meta in file_index.items():
+    for path, meta in index.items():
         parts = path.split('/')
         current = tree
         for part in parts[:-1]:
@@ -90,6 +206,46 @@ def get_file_tree() -> Dict:
     return tree
 
 
+def get_file_tree() -> Dict:
+    """
+    Get the file tree with metadata.
+    
+    The tree is built once per index_directory() call, so treat the
+    result as read-only.
+    
+    Returns:
+        Nested dict representing directory structure
+    """
+    return file_tree
+
+
+def _open_text(full_path: str):
+    """Open a file for text reading with a large read buffer."""
+    return open(full_path, 'r', encoding='utf-8', errors='replace',
+                buffering=READ_BUFFER_SIZE)
+
+
+def _resolve_path(path: str) -> Optional[str]:
+    """
+    Map a relative path to its absolute location, or None if missing.
+    
+    Indexed paths are a single dict lookup; spellings like "./a.py" or
+    "/a.py" are normalized and looked up again before falling back to
+    the filesystem for files that are not indexed.
+    """
+    if path in file_index:
+        return os.path.join(DATA_DIR, path)
+    
+    normalized = posixpath.normpath(path.replace('\\', '/')).lstrip('/')
+    if normalized in file_index:
+        return os.path.join(DATA_DIR, normalized)
+    
+    full_path = os.path.join(DATA_DIR, normalized)
+    if os.path.isfile(full_path):
+        return full_path
+    return None
+
+
 def read_file(path: str) -> str:
     """
     Read a file's content.
@@ -100,23 +256,169 @@ def read_file(path: str) -> str:
     Returns:
         File content as string
     """
-    if path not in file_index:
-        # Try to find it
-        full_path = os.path.join(DATA_DIR, path)
-        if os.path.exists(full_path):
-            try:
-                with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
-                    return f.read()
-            except Exception as e:
-                return f"Error reading file: {e}"
-        return f"File not found: {path}"
-    
-    full_path = os.path.join(DATA_DIR, path)
+    entry = _read_entry(path)
+    return entry["content"] if entry["error"] is None else entry["error"]
+
+
+def _read_entry(path: str) -> Dict[str, Optional[str]]:
+    """Read a file into {"content": ..., "error": ...}; exactly one is None."""
+    full_path = _resolve_path(path)
+    if full_path is None:
+        return {"content": None, "error": f"File not found: {path}"}
+    
     try:
-        with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
-            return f.read()
+        with _open_text(full_path) as f:
+            return {"content": f.read(), "error": None}
     except Exception as e:
-        return f"Error reading file: {e}"
+        return {"content": None, "error": f"Error reading file: {e}"}
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_regex(pattern: Union[str, bytes], flags: int = 0) -> "re.Pattern":
+    """Compile a regex once per distinct pattern."""
+    return re.compile(pattern, flags)
+
+
+# A finder returns the offset of the next match at or after a position (or
+# -1), and says whether it scans decoded text (True) or raw bytes (False)
+_Finder = Tuple[Callable[[Any, int], int], bool]
+
+
+def _scan_lines(
+    path: str,
+    data: Union[bytes, str],
+    find: Callable[[Any, int], int],
+    limit: int
+) -> List[Dict]:
+    """
+    Find matching lines in a file's raw bytes or decoded text.
+    
+    For bytes, only lines that match are decoded.
+    
+    Args:
+        path: Indexed file path (reported in results)
+        data: File content
+        find: Returns the offset of the next match at or after a position,
+              or -1 if there is none
+        limit: Maximum number of matches to return
+    """
+    newline = '\n' if isinstance(data, str) else b'\n'
+    matches = []
+    pos = 0
+    line_no = 1
+    counted_to = 0
+    while len(matches) < limit:
+        start = find(data, pos)
+        if start == -1:
+            break
+        
+        line_start = data.rfind(newline, 0, start) + 1
+        line_end = data.find(newline, start)
+        if line_end == -1:
+            line_end = len(data)
+        
+        line_no += data.count(newline, counted_to, line_start)
+        counted_to = line_start
+        
+        line = data[line_start:line_end]
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        matches.append({
+            'file': path,
+            'line': line_no,
+            'content': line.strip()[:200]
+        })
+        # One result per line, like a line-by-line scan
+        if line_end >= len(data):
+            break
+        pos = line_end + 1
+    return matches
+
+
+def _search_file(path: str, finders: List[_Finder], limit: int) -> List[List[Dict]]:
+    """
+    Read one indexed file and scan it once per finder.
+    
+    The file is decoded (with universal newlines, as read_file() does) at
+    most once: for regex finders, or for every finder if it contains a
+    carriage return, so line numbers match the decoded line split.
+    """
+    try:
+        with open(os.path.join(DATA_DIR, path), 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        log(f"Error searching {path}: {e}")
+        return [[] for _ in finders]
+    
+    text = None
+    has_cr = b'\r' in data
+    results = []
+    for find, needs_text in finders:
+        if (needs_text or has_cr) and text is None:
+            text = data.decode('utf-8', errors='replace')
+            if has_cr:
+                text = text.replace('\r\n', '\n').replace('\r', '\n')
+        scanned = text if needs_text or has_cr else data
+        results.append(_scan_lines(path, scanned, find, limit))
+    return results
+
+
+def _make_finder(pattern: str) -> _Finder:
+    """
+    Build the finder used by _search_file.
+    
+    Patterns without regex metacharacters are plain substrings, so they
+    use bytes.find() on the raw file (str.find() on decoded text) instead
+    of going through the regex engine. Everything else is a str regex
+    run one line at a time, exactly like the line-by-line search: classes
+    such as \\s or [^x] never match across a newline, and non-ASCII and
+    Unicode-aware classes behave as they do on a str.
+    """
+    if not REGEX_SPECIAL_CHARS.intersection(pattern):
+        needle = pattern.encode('utf-8')
+        return (lambda data, pos: data.find(needle if isinstance(data, bytes) else pattern, pos)), False
+    
+    regex = _compile_regex(pattern, re.MULTILINE)
+    
+    def find(text: str, pos: int) -> int:
+        # Each line is searched on its own (endpos stops at the newline);
+        # returning the line start is enough for _scan_lines
+        size = len(text)
+        while pos <= size:
+            line_end = text.find('\n', pos)
+            if line_end == -1:
+                line_end = size
+            if regex.search(text, pos, line_end):
+                return pos
+            pos = line_end + 1
+        return -1
+    return find, True
+
+
+def _search(finders: List[_Finder], file_pattern: str) -> List[List[Dict]]:
+    """
+    Run several finders over the files matching file_pattern.
+    
+    Binary files are skipped. Files are read in parallel, and each file is
+    read once no matter how many finders there are. Results keep file and line order, with at
+    most MAX_SEARCH_MATCHES per finder.
+    """
+    results: List[List[Dict]] = [[] for _ in finders]
+    paths = [p for p in list_files(file_pattern) if not file_index[p].get('binary')]
+    batch_size = FILE_IO_WORKERS * 4
+    
+    with ThreadPoolExecutor(max_workers=FILE_IO_WORKERS) as pool:
+        # Work through files in ordered batches so we can stop early
+        for i in range(0, len(paths), batch_size):
+            batch = paths[i:i + batch_size]
+            for per_finder in pool.map(
+                lambda p: _search_file(p, finders, MAX_SEARCH_MATCHES), batch
+            ):
+                for matches, file_matches in zip(results, per_finder):
+                    matches.extend(file_matches[:MAX_SEARCH_MATCHES - len(matches)])
+                if all(len(m) >= MAX_SEARCH_MATCHES for m in results):  # Limit results
+                    return results
+    return results
 
 
 def search_files(pattern: str, file_pattern: str = "*") -> List[Dict]:
@@ -130,21 +432,89 @@ def search_files(pattern: str, file_pattern: str = "*") -> List[Dict]:
     Returns:
         List of matches with file, line number, and content
     """
-    matches = []
-    regex = re.compile(pattern)
-    
-    for path in list_files(file_pattern):
-        content = read_file(path)
-        for i, line in enumerate(content.split('\n'), 1):
-            if regex.search(line):
-                matches.append({
-                    'file': path,
-                    'line': i,
-                    'content': line.strip()[:200]
-                })
-                if len(matches) >= 100:  # Limit results
-                    return matches
-    return matches
+    return _search([_make_finder(pattern)], file_pattern)[0]
+
+
+def search_files_many(patterns: List[str], file_pattern: str = "*") -> Dict[str, List[Dict]]:
+    """
+    Search for several regex patterns, reading each file only once.
+    
+    Args:
+        patterns: Regex patterns to search for
+        file_pattern: Glob pattern to filter files (e.g., "*.py")
+    
+    Returns:
+        Dict mapping each pattern to its matches, in search_files() format
+    """
+    finders = [_make_finder(p) for p in patterns]
+    return dict(zip(patterns, _search(finders, file_pattern)))
+
+
+def read_files_batch(paths: List[str]) -> Dict[str, str]:
+    """
+    Read several files in parallel.
+    
+    Args:
+        paths: Relative paths from the data directory
+    
+    Returns:
+        Dict mapping each path to its content (or read_file() error text)
+    """
+    if not paths:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(FILE_IO_WORKERS, len(paths))) as pool:
+        return dict(zip(paths, pool.map(read_file, paths)))
+
+
+def _read_entries(paths: List[str]) -> Dict[str, Dict[str, Optional[str]]]:
+    """read_files_batch() with content and errors kept apart, for /bulk_read."""
+    paths = list(dict.fromkeys(paths))
+    if not paths:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(FILE_IO_WORKERS, len(paths))) as pool:
+        return dict(zip(paths, pool.map(_read_entry, paths)))
+
+
+def _llm_cache_key(prompt: str, model: str) -> str:
+    """
+    Build the cache key for an llm_query call.
+    
+    Only leading and trailing whitespace is stripped: inner whitespace is
+    kept because prompts often embed code, where indentation is meaningful.
+    """
+    normalized = prompt.strip()
+    raw = json.dumps({"model": model, "prompt": normalized}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _llm_cache_get(key: str) -> Optional[str]:
+    """Return a cached response, or None if missing or expired."""
+    with _llm_cache_lock:
+        entry = _llm_cache.get(key)
+        if entry is None:
+            llm_cache_stats["misses"] += 1
+            return None
+        
+        timestamp, response = entry
+        if time.time() - timestamp > LLM_CACHE_TTL:
+            del _llm_cache[key]
+            llm_cache_stats["misses"] += 1
+            return None
+        
+        _llm_cache.move_to_end(key)
+        llm_cache_stats["hits"] += 1
+        return response
+
+
+def _llm_cache_put(key: str, response: str):
+    """Store a response, evicting the least recently used entries."""
+    if LLM_CACHE_SIZE <= 0:
+        return
+    with _llm_cache_lock:
+        _llm_cache[key] = (time.time(), response)
+        _llm_cache.move_to_end(key)
+        while len(_llm_cache) > LLM_CACHE_SIZE:
+            _llm_cache.popitem(last=False)
 
 
 def llm_query(prompt: str, model: str = "xiaomi/mimo-v2-flash:free") -> str:
@@ -153,6 +523,8 @@ def llm_query(prompt: str, model: str = "xiaomi/mimo-v2-flash:free") -> str:
     
     This is a simplified version that makes a single LLM call with file context,
     rather than spawning a full agent loop (which was causing timeouts).
+    Successful responses are cached by (model, prompt), so repeated
+    sub-queries across turns skip the network round-trip.
     
     Args:
         prompt: The task/question for the sub-agent
@@ -161,41 +533,44 @@ def llm_query(prompt: str, model: str = "xiaomi/mimo-v2-flash:free") -> str:
     Returns:
         LLM response
     """
-    import requests
-    
     log(f"llm_query called with prompt: {prompt[:100]}...")
     
     # Check recursion depth
-    current_depth = int(os.environ.get("RLM_RECURSION_DEPTH", "0"))
-    max_depth = int(os.environ.get("RLM_MAX_RECURSION_DEPTH", "3"))
+    current_depth = _recursion_depth.get()
     
-    if current_depth >= max_depth:
+    if current_depth >= MAX_RECURSION_DEPTH:
         log(f"Max recursion depth reached: {current_depth}")
-        return f"Error: Max recursion depth ({max_depth}) reached."
+        return f"Error: Max recursion depth ({MAX_RECURSION_DEPTH}) reached."
     
     api_key = os.environ.get("OPENROUTER_API_KEY")
     if not api_key:
         log("No API key found")
         return "Error: OPENROUTER_API_KEY not set"
     
-    # Increment recursion depth
-    os.environ["RLM_RECURSION_DEPTH"] = str(current_depth + 1)
-    log(f"Recursion depth now: {current_depth + 1}")
+    # Build context about available files
+    file_list = list(file_index.keys())[:20]  # Limit to first 20
+    file_context = f"Available files: {file_list}"
     
-    try:
-        # Build context about available files
-        file_list = list(file_index.keys())[:20]  # Limit to first 20
-        file_context = f"Available files: {file_list}"
-        
-        # Enhanced prompt with file context
-        enhanced_prompt = f"""You are a helpful assistant analyzing code/documents.
+    # Enhanced prompt with file context
+    enhanced_prompt = f"""You are a helpful assistant analyzing code/documents.
 
 {file_context}
 
 User request: {prompt}
 
 Provide a direct, helpful answer based on the information given."""
-
+    
+    cache_key = _llm_cache_key(enhanced_prompt, model)
+    cached = _llm_cache_get(cache_key)
+    if cached is not None:
+        log("LLM response served from cache")
+        return cached
+    
+    # Increment recursion depth
+    depth_token = _recursion_depth.set(current_depth + 1)
+    log(f"Recursion depth now: {current_depth + 1}")
+    
+    try:
         log(f"Making LLM request...")
         
         headers = {
@@ -208,7 +583,7 @@ Provide a direct, helpful answer based on the information given."""
             "max_tokens": 1000
         }
         
-        resp = requests.post(
+        resp = _llm_session.post(
             "https://openrouter.ai/api/v1/chat/completions",
             json=payload,
             headers=headers,
@@ -218,6 +593,7 @@ Provide a direct, helpful answer based on the information given."""
         
         result = resp.json()['choices'][0]['message']['content']
         log(f"LLM response received: {len(result)} chars")
+        _llm_cache_put(cache_key, result)
         return result
         
     except requests.Timeout:
@@ -228,7 +604,41 @@ Provide a direct, helpful answer based on the information given."""
         return f"Error: {e}"
     finally:
         # Restore recursion depth
-        os.environ["RLM_RECURSION_DEPTH"] = str(current_depth)
+        _recursion_depth.reset(depth_token)
+
+
+def llm_query_many(prompts: List[str], model: str = "xiaomi/mimo-v2-flash:free") -> List[str]:
+    """
+    Run several llm_query() calls concurrently.
+    
+    Independent sub-queries overlap their network round-trips instead of
+    running one after another. At most RLM_LLM_QUERY_CONCURRENCY requests
+    are in flight at once.
+    
+    Args:
+        prompts: Tasks/questions for the sub-agents
+        model: Model to use
+    
+    Returns:
+        Responses in the same order as prompts
+    """
+    if not prompts:
+        return []
+    
+    workers = min(LLM_QUERY_CONCURRENCY, len(prompts))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Each worker gets a copy of the caller's context so the
+        # recursion depth is inherited
+        futures = [
+            pool.submit(contextvars.copy_context().run, llm_query, p, model)
+            for p in prompts
+        ]
+        return [f.result() for f in futures]
+
+
+async def allm_query(prompt: str, model: str = "xiaomi/mimo-v2-flash:free") -> str:
+    """Awaitable llm_query() that runs the request in a worker thread."""
+    return await asyncio.to_thread(llm_query, prompt, model)
 
 
 # ============================================================================
@@ -237,115 +647,207 @@ Provide a direct, helpful answer based on the information given."""
 
 def execute_code(code: str) -> Dict:
     """Execute code in the persistent namespace."""
-    stdout_capture = io.StringIO()
-    stderr_capture = io.StringIO()
+    with _execution_lock:
+        return run_code(code, global_namespace)
+
+
+def _scan_files(root: str, prefix: str = ""):
+    """
+    Yield (relative path, DirEntry) for every visible file under root.
     
+    Hidden files and directories are skipped and directory symlinks are
+    not followed, matching the previous os.walk() behaviour. Directories
+    named in IGNORED_DIRS are pruned without being opened.
+    """
     try:
-        with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
-            exec(code, global_namespace)
-        
-        stdout = stdout_capture.getvalue()
-        stderr = stderr_capture.getvalue()
-        
-        if len(stdout) > MAX_OUTPUT_SIZE:
-            stdout = stdout[:MAX_OUTPUT_SIZE] + f"\n... [Truncated at {MAX_OUTPUT_SIZE} chars]"
-        
-        return {
-            "success": True,
-            "output": stdout,
-            "error": stderr if stderr else None
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "output": stdout_capture.getvalue(),
-            "error": traceback.format_exc()
-        }
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                
+                rel_path = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in IGNORED_DIRS:
+                        yield from _scan_files(entry.path, rel_path + '/')
+                elif entry.is_file():
+                    yield rel_path, entry
+    except OSError as e:
+        log(f"Error scanning {root}: {e}")
+
+
+def _looks_binary(full_path: str) -> bool:
+    """
+    Sniff the start of a file to decide whether it is binary.
+    
+    A NUL byte or more than 30% control characters means binary. Bytes
+    >= 0x80 are not counted, so UTF-8 text in any script passes.
+    """
+    with open(full_path, 'rb') as f:
+        head = f.read(BINARY_SNIFF_SIZE)
+    if not head:
+        return False
+    if b'\x00' in head:
+        return True
+    control = len(head) - len(head.translate(None, _BINARY_CONTROL_BYTES))
+    return control / len(head) > 0.30
+
+
+def _sniff_entry(full_path: str, info: Dict) -> None:
+    """Fill in the type of a file with an unknown extension."""
+    binary = _looks_binary(full_path)
+    info['binary'] = binary
+    info['type'] = 'binary' if binary else 'text'
 
 
 def index_directory(path: str = DATA_DIR) -> Dict[str, Dict]:
-    """Index all files in the data directory."""
-    global file_index
-    file_index = {}
+    """
+    Index all files in the data directory.
+    
+    Reindexing the same root is incremental: files whose (size, mtime)
+    are unchanged keep their previous entry. Content sniffs for the
+    remaining unknown-extension files run on a thread pool.
+    """
+    global file_index, file_tree, sorted_paths, _index_root, _index_signatures
+    previous = file_index if path == _index_root else {}
+    previous_signatures = _index_signatures if path == _index_root else {}
+    
+    new_index = {}
+    signatures = {}
+    to_sniff = []
+    reused = 0
     
     if not os.path.exists(path):
         log(f"Data directory not found: {path}")
+        file_index, file_tree, sorted_paths = {}, {}, []
+        _index_root, _index_signatures = None, {}
         return file_index
     
-    for root, dirs, files in os.walk(path):
-        # Skip hidden directories
-        dirs[:] = [d for d in dirs if not d.startswith('.')]
-        
-        for fname in files:
-            if fname.startswith('.'):
+    for rel_path, entry in _scan_files(path):
+        try:
+            st = entry.stat()
+            size = st.st_size
+            
+            # Skip large files
+            if size > MAX_FILE_SIZE:
                 continue
             
-            full_path = os.path.join(root, fname)
-            rel_path = os.path.relpath(full_path, path)
+            signature = (size, st.st_mtime_ns)
+            signatures[rel_path] = signature
+            if previous_signatures.get(rel_path) == signature and rel_path in previous:
+                new_index[rel_path] = previous[rel_path]
+                reused += 1
+                continue
             
-            try:
-                stat = os.stat(full_path)
-                size = stat.st_size
-                
-                # Skip large files
-                if size > MAX_FILE_SIZE:
-                    continue
-                
-                # Detect file type
-                ext = os.path.splitext(fname)[1].lower()
-                file_type = {
-                    '.py': 'python',
-                    '.js': 'javascript',
-                    '.ts': 'typescript',
-                    '.jsx': 'react',
-                    '.tsx': 'react',
-                    '.java': 'java',
-                    '.c': 'c',
-                    '.cpp': 'cpp',
-                    '.h': 'header',
-                    '.go': 'go',
-                    '.rs': 'rust',
-                    '.rb': 'ruby',
-                    '.php': 'php',
-                    '.md': 'markdown',
-                    '.txt': 'text',
-                    '.json': 'json',
-                    '.yaml': 'yaml',
-                    '.yml': 'yaml',
-                    '.xml': 'xml',
-                    '.html': 'html',
-                    '.css': 'css',
-                    '.sql': 'sql',
-                    '.sh': 'shell',
-                }.get(ext, 'text')
-                
-                file_index[rel_path] = {
-                    'size': size,
-                    'type': file_type,
-                    'ext': ext
-                }
-            except Exception as e:
-                log(f"Error indexing {full_path}: {e}")
-    
-    log(f"Indexed {len(file_index)} files")
+            # Detect file type; only unknown extensions need a content sniff
+            ext = os.path.splitext(entry.name)[1].lower()
+            file_type = EXT_FILE_TYPES.get(ext)
+            info = {
+                'size': size,
+                'type': file_type or 'text',
+                'ext': ext,
+                'binary': False
+            }
+            if file_type is None:
+                to_sniff.append((rel_path, entry.path, info))
+            new_index[rel_path] = info
+        except Exception as e:
+            log(f"Error indexing {entry.path}: {e}")
+    
+    if to_sniff:
+        with ThreadPoolExecutor(max_workers=min(FILE_IO_WORKERS, len(to_sniff))) as pool:
+            futures = [(rel_path, full_path, pool.submit(_sniff_entry, full_path, info))
+                       for rel_path, full_path, info in to_sniff]
+            for rel_path, full_path, future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    log(f"Error indexing {full_path}: {e}")
+                    del new_index[rel_path]
+                    signatures.pop(rel_path, None)
+    
+    file_index = new_index
+    _index_root = path
+    _index_signatures = signatures
+    file_tree = _build_file_tree(file_index)
+    sorted_paths = sorted(file_index)
+    log(f"Indexed {len(file_index)} files ({reused} unchanged)")
     return file_index
 
 
+def load_context(path: str = CONTEXT_FILE):
+    """
+    Expose the single-file mode document as `context` and `context_bytes`.
+    
+    Large files are memory-mapped: `context_bytes` is a zero-copy view of
+    the file and `context` is decoded straight from the mapped pages, so
+    no intermediate bytes copy is made.
+    """
+    if not os.path.isfile(path):
+        return
+    
+    try:
+        if os.path.getsize(path) >= MMAP_MIN_SIZE:
+            with open(path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            with open(path, 'rb') as f:
+                data = f.read()
+    except OSError as e:
+        log(f"Error loading context: {e}")
+        return
+    
+    global_namespace['context_bytes'] = data
+    global_namespace['context'] = str(data, 'utf-8', 'replace')
+    log(f"Loaded context: {len(data)} bytes")
+
+
+# Names injected by initialize_namespace(), hidden from /status
+NAMESPACE_BUILTINS = (
+    'list_files', 'get_file_tree', 'read_file', 'search_files', 'search_files_many',
+    'read_files_batch', 'llm_query', 'llm_query_many', 'allm_query', 'files',
+    'context', 'context_bytes'
+)
+
+
 def initialize_namespace():
     """Initialize the global namespace with helper functions."""
     global_namespace['list_files'] = list_files
     global_namespace['get_file_tree'] = get_file_tree
     global_namespace['read_file'] = read_file
     global_namespace['search_files'] = search_files
+    global_namespace['search_files_many'] = search_files_many
+    global_namespace['read_files_batch'] = read_files_batch
     global_namespace['llm_query'] = llm_query
+    global_namespace['llm_query_many'] = llm_query_many
+    global_namespace['allm_query'] = allm_query
     global_namespace['files'] = file_index
+    load_context()
 
 
 # ============================================================================
 # FastAPI Application
 # ============================================================================
 
-app = FastAPI(title="RLM Sandbox Server", version="2.0.0")
+class OrjsonResponse(JSONResponse):
+    """
+    JSON response encoded with orjson.
+    
+    Defined here because FastAPI has deprecated its own ORJSONResponse
+    and the FastAPI install is not pinned.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+
+app = FastAPI(
+    title="RLM Sandbox Server",
+    version="2.0.0",
+    default_response_class=OrjsonResponse
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -354,6 +856,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Large outputs and file contents are text and compress well; small
+# responses go out as-is
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
+
 
 # Request/Response Models
 class ExecuteRequest(BaseModel):
@@ -366,12 +872,20 @@ class ExecuteResponse(BaseModel):
 
 class StatusResponse(BaseModel):
     status: str
+    index_ready: bool
     files_indexed: int
     namespace_vars: List[str]
 
 class GetVarRequest(BaseModel):
     name: str
 
+class ExecAndGetRequest(BaseModel):
+    code: str
+    name: str
+
+class BulkReadRequest(BaseModel):
+    paths: List[str]
+
 
 # Auth dependency
 async def verify_api_key(x_api_key: str = Header(None)):
@@ -380,66 +894,201 @@ async def verify_api_key(x_api_key: str = Header(None)):
     return True
 
 
+# Index dependency
+async def wait_for_index():
+    """Hold a request until the startup index is built (503 on timeout or failure)."""
+    if not _index_ready.is_set():
+        try:
+            await asyncio.wait_for(_index_ready.wait(), timeout=INDEX_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="File index is still being built")
+    if _index_error is not None:
+        raise HTTPException(status_code=503, detail=f"Startup indexing failed: {_index_error}")
+    return True
+
+
 @app.get("/status", response_model=StatusResponse)
 async def get_status(auth: bool = Depends(verify_api_key)):
     """Health check and status."""
     user_vars = [k for k in global_namespace.keys() 
-                 if not k.startswith('_') and k not in 
-                 ('list_files', 'get_file_tree', 'read_file', 'search_files', 'llm_query', 'files')]
+                 if not k.startswith('_') and k not in NAMESPACE_BUILTINS]
+    if _index_error is not None:
+        status, ready = "failed", False
+    elif _index_ready.is_set():
+        status, ready = "ready", True
+    else:
+        status, ready = "indexing", False
     return StatusResponse(
-        status="ready",
+        status=status,
+        index_ready=ready,
         files_indexed=len(file_index),
         namespace_vars=user_vars
     )
 
 
 @app.post("/execute", response_model=ExecuteResponse)
-async def execute(request: ExecuteRequest, auth: bool = Depends(verify_api_key)):
+async def execute(request: ExecuteRequest, auth: bool = Depends(verify_api_key),
+                  ready: bool = Depends(wait_for_index)):
     """Execute Python code in the persistent REPL."""
     log(f"Executing code ({len(request.code)} chars)")
-    result = execute_code(request.code)
+    result = await run_in_threadpool(execute_code, request.code)
     return ExecuteResponse(**result)
 
 
 @app.get("/files")
-async def get_files(pattern: str = "*", auth: bool = Depends(verify_api_key)):
+async def get_files(pattern: str = "*", auth: bool = Depends(verify_api_key),
+                    ready: bool = Depends(wait_for_index)):
     """List indexed files."""
-    return {"files": list_files(pattern)}
+    return {"files": await run_in_threadpool(list_files, pattern)}
+
+
+def _file_etag(full_path: str) -> str:
+    """
+    Validator for a file's current version, from its mtime and size.
+    
+    The tag is weak: GZipMiddleware may send the same version gzipped
+    or as-is, and those are not byte-identical representations.
+    """
+    st = os.stat(full_path)
+    return f'W/"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def _opaque_tag(tag: str) -> str:
+    """An entity tag without its weak marker, for weak comparison."""
+    return tag[2:] if tag.startswith('W/') else tag
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header (list, weak or '*') against an ETag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or _opaque_tag(etag) in map(_opaque_tag, candidates)
 
 
 @app.get("/file/{path:path}")
-async def get_file(path: str, auth: bool = Depends(verify_api_key)):
-    """Read a specific file."""
-    content = read_file(path)
+async def get_file(
+    path: str,
+    raw: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    auth: bool = Depends(verify_api_key),
+    ready: bool = Depends(wait_for_index)
+):
+    """
+    Read a specific file.
+    
+    With ?raw=1 the file bytes are streamed as-is (sendfile where the
+    platform supports it) instead of being decoded into a JSON envelope.
+    Both forms carry an ETag; a matching If-None-Match gets a bodiless 304.
+    """
+    full_path = _resolve_path(path)
+    if full_path is None:
+        raise HTTPException(status_code=404, detail=f"File not found: {path}")
+    
+    etag = _file_etag(full_path)
+    if not raw:
+        etag = etag[:-1] + '-json"'  # the envelope is a different representation
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    if raw:
+        return FileResponse(full_path, media_type="text/plain; charset=utf-8",
+                            headers={"ETag": etag})
+    
+    content = await run_in_threadpool(read_file, path)
     if content.startswith("Error") or content.startswith("File not found"):
         raise HTTPException(status_code=404, detail=content)
-    return {"path": path, "content": content}
+    return OrjsonResponse({"path": path, "content": content}, headers={"ETag": etag})
+
+
+@app.post("/bulk_read")
+async def bulk_read(request: BulkReadRequest, auth: bool = Depends(verify_api_key),
+                    ready: bool = Depends(wait_for_index)):
+    """
+    Read several files in one request.
+    
+    Each path maps to {"content": ..., "error": ...}; a missing or
+    unreadable file sets "error" instead of failing the whole batch.
+    """
+    return {"results": await run_in_threadpool(_read_entries, request.paths)}
+
+
+@app.get("/search")
+async def search(pattern: str, file_pattern: str = "*", auth: bool = Depends(verify_api_key),
+                 ready: bool = Depends(wait_for_index)):
+    """Search indexed files for a regex pattern."""
+    try:
+        matches = await run_in_threadpool(search_files, pattern, file_pattern)
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid pattern: {e}")
+    return {"matches": matches}
 
 
 @app.post("/reindex")
-async def reindex(auth: bool = Depends(verify_api_key)):
+async def reindex(auth: bool = Depends(verify_api_key),
+                  ready: bool = Depends(wait_for_index)):
     """Reindex the data directory."""
-    index_directory()
+    await run_in_threadpool(index_directory)
     global_namespace['files'] = file_index
     return {"files_indexed": len(file_index)}
 
 
+def _value_response(payload: Dict[str, Any]) -> Response:
+    """
+    Encode a response carrying a namespace value under "value".
+    
+    The payload is serialized exactly once; if orjson can't encode the
+    value it is sent as its repr() instead.
+    """
+    try:
+        body = orjson.dumps(
+            payload,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+    except TypeError:  # orjson.JSONEncodeError is a TypeError
+        body = orjson.dumps({**payload, "value": repr(payload["value"])})
+    return Response(content=body, media_type="application/json")
+
+
 @app.post("/get_var")
-async def get_variable(request: GetVarRequest, auth: bool = Depends(verify_api_key)):
+async def get_variable(request: GetVarRequest, auth: bool = Depends(verify_api_key),
+                       ready: bool = Depends(wait_for_index)):
     """Get a variable from the namespace."""
     if request.name not in global_namespace:
         raise HTTPException(status_code=404, detail=f"Variable '{request.name}' not found")
     
-    value = global_namespace[request.name]
-    try:
-        json.dumps(value)
-        return {"success": True, "value": value}
-    except (TypeError, ValueError):
-        return {"success": True, "value": repr(value)}
+    return _value_response({"success": True, "value": global_namespace[request.name]})
+
+
+@app.post("/exec_and_get")
+async def exec_and_get(request: ExecAndGetRequest, auth: bool = Depends(verify_api_key),
+                       ready: bool = Depends(wait_for_index)):
+    """
+    Execute code, then return the result together with one variable.
+    
+    Saves the agent a second round-trip when a response both runs code
+    and answers with FINAL_VAR. "found" is False if the variable does
+    not exist after execution.
+    """
+    log(f"Executing code ({len(request.code)} chars), then reading '{request.name}'")
+    result = await run_in_threadpool(execute_code, request.code)
+    found = request.name in global_namespace
+    return _value_response({
+        **result,
+        "found": found,
+        "value": global_namespace.get(request.name) if found else None
+    })
+
+
+@app.get("/cache_stats")
+async def cache_stats(auth: bool = Depends(verify_api_key)):
+    """Report llm_query cache hit/miss counters."""
+    return {**llm_cache_stats, "size": len(_llm_cache)}
 
 
 @app.post("/reset")
-async def reset_namespace(auth: bool = Depends(verify_api_key)):
+async def reset_namespace(auth: bool = Depends(verify_api_key),
+                          ready: bool = Depends(wait_for_index)):
     """Reset the namespace (clear user variables)."""
     global global_namespace
     global_namespace = {}
@@ -454,18 +1103,63 @@ async def reset_namespace(auth: bool = Depends(verify_api_key)):
 @app.on_event("startup")
 async def startup():
     log("Starting RLM Sandbox Server...")
-    index_directory()
-    initialize_namespace()
-    log(f"Ready. Indexed {len(file_index)} files.")
+    if THREADPOOL_SIZE > 0:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    global _index_task
+    # Build the index off the event loop so /status answers right away
+    _index_task = asyncio.get_running_loop().create_task(_build_index())
+
+
+async def _build_index():
+    """
+    Index the data directory and set up the namespace, then mark ready.
+    
+    On failure the error is recorded so /status reports "failed" and
+    waiting requests get a 503 instead of running without a namespace.
+    """
+    global _index_error
+    
+    def build():
+        index_directory()
+        initialize_namespace()
+    
+    try:
+        await run_in_threadpool(build)
+        log(f"Ready. Indexed {len(file_index)} files.")
+    except Exception as e:
+        _index_error = str(e) or type(e).__name__
+        log(f"Startup indexing failed: {e}")
+    finally:
+        _index_ready.set()
 
 
 def main():
     """Run the server."""
     port = int(os.environ.get("PORT", 8080))
     host = os.environ.get("HOST", "0.0.0.0")
+    # Each worker process has its own namespace and file index, so only
+    # raise this for stateless use (files/search) behind sticky routing
+    workers = int(os.environ.get("WORKERS", "1"))
+    # uvicorn's own logging; our log() output goes to stderr regardless
+    log_level = os.environ.get("LOG_LEVEL", "warning")
     
-    log(f"Starting server on {host}:{port}")
-    uvicorn.run(app, host=host, port=port, log_level="info")
+    log(f"Starting server on {host}:{port} ({workers} worker(s))")
+    uvicorn.run(
+        # Multiple workers need an import string so each can load the app
+        "repl_server:app" if workers > 1 else app,
+        host=host,
+        port=port,
+        workers=workers,
+        log_level=log_level,
+        # "auto" picks uvloop and httptools when installed (uvicorn[standard]
+        # in the image) and falls back to asyncio/h11 for bare local runs
+        loop="auto",
+        http="auto",
+        access_log=False,  # We already log each execution ourselves
+        # Agent turns are seconds apart (LLM latency), so keep client
+        # connections open well past uvicorn's 5s default
+        timeout_keep_alive=75
+    )
 
 
 if __name__ == "__main__":
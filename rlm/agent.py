@@ -7,12 +7,14 @@ Supports both local Docker and remote HTTP sandboxes.
 """
 
 import os
+import re
+import mmap
 from typing import List, Dict, Optional, Any, Union
 
 from .clients.openrouter import OpenRouterClient
 from .clients.docker_sandbox import DockerSandbox
 from .clients.remote_sandbox import RemoteSandbox
-from .prompts import format_system_prompt
+from .prompts import format_file_prompt, format_directory_prompt
 from .parser import (
     extract_first_code_block,
     detect_final_answer,
@@ -21,6 +23,10 @@ from .parser import (
 )
 
 
+_WORD_RE = re.compile(rb"\S+")
+_UTF8_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
+
 class RLMAgent:
     """
     Recursive Language Model Agent.
@@ -31,6 +37,9 @@ class RLMAgent:
     
     DEFAULT_MAX_TURNS = 15
     DEFAULT_TRUNCATION_LIMIT = 30000  # High limit to avoid retry loops
+    DEFAULT_MAX_HISTORY = 8  # Messages kept after the query (4 exchanges)
+    
+    STATS_CHUNK_SIZE = 1024 * 1024  # bytes per slice when counting characters
     
     def __init__(
         self,
@@ -40,7 +49,9 @@ class RLMAgent:
         truncation_limit: int = DEFAULT_TRUNCATION_LIMIT,
         verbose: bool = True,
         remote_url: Optional[str] = None,
-        remote_api_key: Optional[str] = None
+        remote_api_key: Optional[str] = None,
+        max_history: Optional[int] = DEFAULT_MAX_HISTORY,
+        stream: bool = False
     ):
         """
         Initialize the RLM Agent.
@@ -53,7 +64,15 @@ class RLMAgent:
             verbose: Whether to print progress
             remote_url: URL for remote sandbox server (None for local Docker)
             remote_api_key: API key for remote sandbox auth
+            max_history: Recent messages kept verbatim after the query;
+                         older exchanges are collapsed into a note.
+                         Must be 0 (or None) to keep the full history, or
+                         at least 2; odd values round down to whole exchanges
+            stream: Stream model responses, printing them live when verbose
         """
+        if max_history and max_history < 2:
+            raise ValueError("max_history must be 0 (keep everything) or at least 2")
+        
         self.api_key = api_key or os.environ.get("OPENROUTER_API_KEY")
         self.model = model
         self.max_turns = max_turns
@@ -61,6 +80,9 @@ class RLMAgent:
         self.verbose = verbose
         self.remote_url = remote_url
         self.remote_api_key = remote_api_key
+        # Whole exchanges only, so assistant/user pairs stay aligned
+        self.max_history = (max_history - max_history % 2) if max_history else 0
+        self.stream = stream
         
         self.llm_client = OpenRouterClient(
             api_key=self.api_key,
@@ -71,6 +93,7 @@ class RLMAgent:
         self.history: List[Dict[str, str]] = []
         self.turn_count = 0
         self.is_directory_mode = False
+        self._omitted_turns = 0
     
     def _log(self, message: str):
         """Print a log message if verbose mode is enabled."""
@@ -78,14 +101,30 @@ class RLMAgent:
             print(message)
     
     def _get_file_stats(self, file_path: str) -> Dict[str, Any]:
-        """Get statistics about a context file."""
-        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
+        """
+        Get statistics about a context file.
+        
+        The file is memory-mapped and scanned as bytes, so nothing is
+        decoded and the kernel pages it in on demand. The length is in
+        characters: UTF-8 continuation bytes are not counted.
+        """
+        length = words = lines = 0
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    size = len(m)
+                    for start in range(0, size, self.STATS_CHUNK_SIZE):
+                        chunk = m[start:start + self.STATS_CHUNK_SIZE]
+                        length += len(chunk.translate(None, _UTF8_CONTINUATION_BYTES))
+                        lines += chunk.count(b'\n')
+                    words = sum(1 for _ in _WORD_RE.finditer(m))
+                    if m[size - 1] != 0x0A:
+                        lines += 1  # trailing line without a newline
         
         return {
-            'length': len(content),
-            'words': len(content.split()),
-            'lines': len(content.splitlines()),
+            'length': length,
+            'words': words,
+            'lines': lines,
             'path': file_path
         }
     
@@ -97,20 +136,63 @@ class RLMAgent:
             count += len([f for f in files if not f.startswith('.')])
         return count
     
+    def _compact_history(self):
+        """
+        Keep the prompt bounded by collapsing old exchanges.
+        
+        The system prompt, the query and the last max_history messages
+        are kept; everything in between is replaced by one short note.
+        Without this every turn resends the whole conversation, so the
+        total tokens sent grow quadratically with the number of turns.
+        """
+        if not self.max_history:
+            return
+        
+        head = self.history[:2]
+        body = self.history[3:] if self._omitted_turns else self.history[2:]
+        if len(body) <= self.max_history:
+            return
+        
+        dropped = len(body) - self.max_history
+        self._omitted_turns += dropped // 2
+        note = {
+            "role": "user",
+            "content": (
+                f"[{self._omitted_turns} earlier turns omitted to keep the prompt short. "
+                "Variables they created are still defined in the sandbox.]"
+            )
+        }
+        self.history = head + [note] + body[dropped:]
+    
+    def _stream_response(self) -> str:
+        """Collect a streamed model response, echoing it as it arrives."""
+        self._log("Model response:")
+        parts = []
+        for delta in self.llm_client.chat_stream(self.history):
+            parts.append(delta)
+            if self.verbose:
+                print(delta, end="", flush=True)
+        self._log("")
+        return "".join(parts)
+    
     def _run_loop(self, query: str, system_prompt: str) -> str:
         """Run the main agent loop."""
         self.history = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": f"Query: {query}"}
         ]
+        self._omitted_turns = 0
         
         for turn in range(self.max_turns):
             self.turn_count = turn + 1
             self._log(f"\n--- Turn {self.turn_count}/{self.max_turns} ---")
             
             # Call root LLM
-            response = self.llm_client.chat(self.history)
-            self._log(f"Model response:\n{response[:500]}{'...' if len(response) > 500 else ''}")
+            if self.stream:
+                response = self._stream_response()
+            else:
+                response = self.llm_client.chat(self.history)
+                self._log(f"Model response:\n{response[:500]}{'...' if len(response) > 500 else ''}")
             
             # Extract code block
             code_block = extract_first_code_block(response)
@@ -121,7 +203,12 @@ class RLMAgent:
             if code_block:
                 self._log(f"Executing code:\n{code_block[:300]}{'...' if len(code_block) > 300 else ''}")
                 
-                result = self.sandbox.exec_code(code_block)
+                value = None
+                if is_final and answer_type == 'FINAL_VAR':
+                    # Run the code and fetch the answer variable in one round-trip
+                    result, value = self.sandbox.exec_and_get(code_block, answer_content)
+                else:
+                    result = self.sandbox.exec_code(code_block)
                 formatted_result = format_execution_result(result)
                 truncated_result = truncate_output(formatted_result, self.truncation_limit)
                 
@@ -130,7 +217,6 @@ class RLMAgent:
                 if is_final:
                     self._log(f"\nFinal answer detected ({answer_type})")
                     if answer_type == 'FINAL_VAR':
-                        value = self.sandbox.get_variable(answer_content)
                         if value is not None:
                             return str(value)
                         return f"Variable '{answer_content}' not found. Output:\n{truncated_result}"
@@ -138,6 +224,7 @@ class RLMAgent:
                 
                 self.history.append({"role": "assistant", "content": response})
                 self.history.append({"role": "user", "content": f"Execution Result:\n{truncated_result}"})
+                self._compact_history()
             
             elif is_final:
                 self._log(f"\nFinal answer detected ({answer_type})")
@@ -155,6 +242,7 @@ class RLMAgent:
                     "role": "user",
                     "content": "Continue with your analysis. Execute code or provide the final answer using FINAL()."
                 })
+                self._compact_history()
         
         self._log("\nMax turns reached without final answer")
         return f"Error: Maximum turns reached. Last response:\n{response}"
@@ -203,10 +291,10 @@ class RLMAgent:
                 return "Error: Failed to start sandbox"
         
         try:
-            system_prompt = format_system_prompt(
+            system_prompt = format_file_prompt(
                 context_length=file_stats['length'],
                 context_type=context_type,
-                is_directory=False
+                context_words=file_stats['words']
             )
             return self._run_loop(query, system_prompt)
         finally:
@@ -265,10 +353,9 @@ class RLMAgent:
                 return "Error: Failed to start sandbox"
         
         try:
-            system_prompt = format_system_prompt(
+            system_prompt = format_directory_prompt(
                 file_count=file_count,
-                context_type=context_type,
-                is_directory=True
+                context_type=context_type
             )
             return self._run_loop(query, system_prompt)
         finally:
@@ -278,16 +365,7 @@ class RLMAgent:
     
     def _image_exists(self) -> bool:
         """Check if the Docker image already exists."""
-        import subprocess
-        try:
-            result = subprocess.run(
-                ["docker", "images", "-q", DockerSandbox.IMAGE_NAME],
-                capture_output=True,
-                text=True
-            )
-            return bool(result.stdout.strip())
-        except Exception:
-            return False
+        return DockerSandbox.image_exists()
     
     def get_history(self) -> List[Dict[str, str]]:
         """Get the conversation history."""
@@ -6,13 +6,38 @@ for executing code via HTTP API (delegating to RemoteSandbox).
 """
 
 import subprocess
+import shutil
+import functools
 import time
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
 from .remote_sandbox import RemoteSandbox
 
 
+@functools.lru_cache(maxsize=1)
+def _docker_executable() -> str:
+    """
+    Resolve the docker CLI to an absolute path once per process.
+    
+    subprocess only takes the cheaper posix_spawn() path (instead of
+    fork + exec) when given an explicit path, so PATH is searched here
+    rather than on every call. Falls back to the bare name so a missing
+    install still surfaces as FileNotFoundError.
+    """
+    return shutil.which("docker") or "docker"
+
+
+def _run_docker(*args: str, **kwargs) -> subprocess.CompletedProcess:
+    """
+    Run a docker CLI command.
+    
+    close_fds=False lets CPython spawn via posix_spawn(); descriptors
+    are non-inheritable by default (PEP 446), so none leak into docker.
+    """
+    return subprocess.run([_docker_executable(), *args], close_fds=False, **kwargs)
+
+
 class DockerSandbox:
     """
     Manages a Docker container running the RLM sandbox server.
@@ -25,6 +50,10 @@ class DockerSandbox:
     CONTAINER_NAME = "rlm-sandbox-instance"
     DEFAULT_PORT = 8080
     
+    # Set once the image is known to exist; shared by every sandbox in
+    # the process so repeat runs skip the `docker images` call
+    _image_present = False
+    
     def __init__(
         self,
         context_file: Optional[str] = None,
@@ -58,6 +87,22 @@ class DockerSandbox:
         if self.verbose:
             print(f"[DockerSandbox] {message}")
     
+    @classmethod
+    def image_exists(cls) -> bool:
+        """Check if the sandbox image exists (positive result is cached)."""
+        if cls._image_present:
+            return True
+        try:
+            result = _run_docker(
+                "images", "-q", cls.IMAGE_NAME,
+                capture_output=True,
+                text=True
+            )
+        except Exception:
+            return False
+        DockerSandbox._image_present = bool(result.stdout.strip())
+        return DockerSandbox._image_present
+    
     def build_image(self, dockerfile_dir: str = ".") -> bool:
         """
         Build the Docker image from the Dockerfile.
@@ -70,8 +115,8 @@ class DockerSandbox:
         """
         self._log(f"Building image from {dockerfile_dir}...")
         try:
-            result = subprocess.run(
-                ["docker", "build", "-t", self.IMAGE_NAME, dockerfile_dir],
+            result = _run_docker(
+                "build", "-t", self.IMAGE_NAME, dockerfile_dir,
                 capture_output=True,
                 text=True,
                 timeout=300
@@ -80,6 +125,7 @@ class DockerSandbox:
                 self._log(f"Build failed: {result.stderr}")
                 return False
             self._log("Image built successfully")
+            DockerSandbox._image_present = True
             return True
         except subprocess.TimeoutExpired:
             self._log("Build timed out")
@@ -98,9 +144,13 @@ class DockerSandbox:
         # Stop any existing container first
         self.stop()
         
+        # Set up the client before launching, so polling can begin the
+        # moment `docker run` returns
+        self._remote = self._make_remote()
+        
         # Build docker run command
         cmd = [
-            "docker", "run",
+            "run",
             "-d",  # Detached mode
             "--rm",  # Remove when stopped
             "--name", self.CONTAINER_NAME,
@@ -130,8 +180,8 @@ class DockerSandbox:
         
         try:
             self._log("Starting container...")
-            result = subprocess.run(
-                cmd,
+            result = _run_docker(
+                *cmd,
                 capture_output=True,
                 text=True,
                 timeout=30
@@ -139,6 +189,7 @@ class DockerSandbox:
             
             if result.returncode != 0:
                 self._log(f"Failed to start container: {result.stderr}")
+                self._close_remote()
                 return False
             
             self._container_id = result.stdout.strip()[:12]
@@ -149,36 +200,48 @@ class DockerSandbox:
             
         except subprocess.TimeoutExpired:
             self._log("Container start timed out")
+            self._close_remote()
             return False
         except Exception as e:
             self._log(f"Error starting container: {e}")
+            self._close_remote()
             return False
     
-    def _wait_for_ready(self, timeout: float = 30, poll_interval: float = 0.5) -> bool:
+    def _make_remote(self) -> RemoteSandbox:
+        """Create the HTTP client for the container's server."""
+        return RemoteSandbox(
+            server_url=f"http://localhost:{self.port}",
+            timeout=300  # Sub-agents may need multiple LLM calls
+        )
+    
+    def _wait_for_ready(self, timeout: float = 30, max_poll_interval: float = 0.25) -> bool:
         """
         Wait for the HTTP server to become ready.
         
+        Polls start at 20ms and back off by 1.6x up to max_poll_interval,
+        so a fast boot is noticed within milliseconds while a slow one
+        isn't hammered.
+        
         Args:
             timeout: Maximum time to wait in seconds
-            poll_interval: Time between health checks
+            max_poll_interval: Longest time between health checks
         
         Returns:
             True if server is ready
         """
         self._log(f"Waiting for server on port {self.port}...")
         
-        # Create RemoteSandbox client - long timeout for sub-agent LLM calls
-        self._remote = RemoteSandbox(
-            server_url=f"http://localhost:{self.port}",
-            timeout=300  # Sub-agents may need multiple LLM calls
-        )
+        if not self._remote:
+            self._remote = self._make_remote()
         
-        start_time = time.time()
-        while time.time() - start_time < timeout:
+        deadline = time.monotonic() + timeout
+        delay = 0.02
+        while time.monotonic() < deadline:
             if self._remote.ping():
                 self._log("Server is ready")
                 return True
-            time.sleep(poll_interval)
+            time.sleep(delay)
+            delay = min(delay * 1.6, max_poll_interval)
         
         self._log("Server failed to become ready")
         return False
@@ -216,6 +279,25 @@ class DockerSandbox:
             return None
         return self._remote.get_variable(name)
     
+    def exec_and_get(self, code: str, name: str) -> Tuple[Dict[str, Any], Optional[Any]]:
+        """
+        Execute code and read a variable in one round-trip.
+        
+        Args:
+            code: Python code to execute
+            name: Variable name to read afterwards
+        
+        Returns:
+            Tuple of (execution result dict, variable value or None)
+        """
+        if not self._remote:
+            return {
+                "success": False,
+                "output": "",
+                "error": "Container is not running"
+            }, None
+        return self._remote.exec_and_get(code, name)
+    
     def ping(self) -> bool:
         """Check if the container is responsive."""
         if not self._remote:
@@ -228,14 +310,20 @@ class DockerSandbox:
             return 0
         return self._remote.reindex()
     
+    def _close_remote(self):
+        """Drop the HTTP client, releasing its connections."""
+        if self._remote:
+            self._remote.close()
+        self._remote = None
+    
     def stop(self):
         """Stop and remove the Docker container."""
-        self._remote = None
+        self._close_remote()
         
         # Force remove container if it exists
         try:
-            subprocess.run(
-                ["docker", "rm", "-f", self.CONTAINER_NAME],
+            _run_docker(
+                "rm", "-f", self.CONTAINER_NAME,
                 capture_output=True,
                 timeout=10
             )
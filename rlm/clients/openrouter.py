@@ -5,8 +5,12 @@ Handles communication with OpenRouter for root agent LLM calls.
 """
 
 import os
+import asyncio
+import orjson
 import requests
-from typing import List, Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Dict, Optional, Iterator
 
 
 class OpenRouterClient:
@@ -37,12 +41,32 @@ class OpenRouterClient:
         self.default_model = default_model
         self.timeout = timeout
         
-        self.headers = {
+        # Keep-alive session so each turn reuses the TLS connection
+        # instead of handshaking with OpenRouter again; rate limits and
+        # transient 5xx are retried with backoff rather than failing the turn
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=3,
+                read=0,  # a request that reached the model is not resent
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"GET", "POST"}),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+        ))
+        
+        # Set once on the session; requests merges them into every call
+        self._session.headers.update({
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "HTTP-Referer": "https://github.com/rlm-engine",
             "X-Title": "RLM Engine"
-        }
+        })
+        self.headers = self._session.headers
     
     def chat(
         self,
@@ -75,21 +99,110 @@ class OpenRouterClient:
         if max_tokens:
             payload["max_tokens"] = max_tokens
         
-        response = requests.post(
+        response = self._session.post(
             self.BASE_URL,
-            json=payload,
-            headers=self.headers,
+            data=orjson.dumps(payload),
             timeout=self.timeout
         )
         response.raise_for_status()
         
-        result = response.json()
+        result = orjson.loads(response.content)
         
         if "error" in result:
             raise RuntimeError(f"OpenRouter API error: {result['error']}")
         
         return result['choices'][0]['message']['content']
     
+    def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Send a streaming chat completion request.
+        
+        Yields content deltas as the server-sent events arrive, so callers
+        can show or inspect the response while the model is generating.
+        Closing the generator early closes the connection.
+        
+        Raises:
+            requests.RequestException: On API errors
+            RuntimeError: If the stream reports an error
+        """
+        payload = {
+            "model": model or self.default_model,
+            "messages": messages,
+            "temperature": temperature,
+            "stream": True
+        }
+        
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        
+        with self._session.post(
+            self.BASE_URL,
+            data=orjson.dumps(payload),
+            timeout=self.timeout,
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            
+            for line in response.iter_lines():
+                # Skip keep-alive blank lines and ": comment" lines
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                
+                chunk = orjson.loads(data)
+                if "error" in chunk:
+                    raise RuntimeError(f"OpenRouter API error: {chunk['error']}")
+                
+                choices = chunk.get("choices")
+                if choices:
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        yield content
+    
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """Awaitable chat() that runs the request in a worker thread."""
+        return await asyncio.to_thread(self.chat, messages, model, temperature, max_tokens)
+    
+    async def achat_batch(
+        self,
+        conversations: List[List[Dict[str, str]]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        max_concurrency: int = 8
+    ) -> List[str]:
+        """
+        Run several independent chat requests concurrently.
+        
+        Args:
+            conversations: One message list per request
+            max_concurrency: Maximum requests in flight at once
+        
+        Returns:
+            Responses in the same order as conversations
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def one(messages):
+            async with semaphore:
+                return await self.achat(messages, model, temperature, max_tokens)
+        
+        return await asyncio.gather(*(one(m) for m in conversations))
+    
     def chat_with_metadata(
         self,
         messages: List[Dict[str, str]],
@@ -112,12 +225,15 @@ class OpenRouterClient:
         if max_tokens:
             payload["max_tokens"] = max_tokens
         
-        response = requests.post(
+        response = self._session.post(
             self.BASE_URL,
-            json=payload,
-            headers=self.headers,
+            data=orjson.dumps(payload),
             timeout=self.timeout
         )
         response.raise_for_status()
         
-        return response.json()
+        return orjson.loads(response.content)
+    
+    def close(self):
+        """Close pooled HTTP connections."""
+        self._session.close()
@@ -5,13 +5,20 @@ HTTP client for communicating with a remote RLM sandbox server.
 """
 
 import os
+import logging
 import tarfile
 import tempfile
+import orjson
 import requests
-from typing import Optional, Dict, Any, List
+from requests.adapters import HTTPAdapter
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
 from pathlib import Path
 
 
+logger = logging.getLogger(__name__)
+
+
 class RemoteSandbox:
     """
     Client for a remote RLM sandbox server.
@@ -19,6 +26,11 @@ class RemoteSandbox:
     Communicates via HTTP API instead of Docker stdin/stdout.
     """
     
+    FILE_CACHE_SIZE = 64  # files kept for ETag revalidation
+    # Only requests that are safe to send twice are retried on a dropped
+    # connection; a POST may already have started running user code
+    RETRY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+    
     def __init__(
         self,
         server_url: str,
@@ -37,32 +49,66 @@ class RemoteSandbox:
         self.api_key = api_key or os.environ.get("RLM_API_KEY", "")
         self.timeout = timeout
         
-        self.headers = {}
+        # One keep-alive session for all calls, so each agent turn
+        # reuses the same connection instead of reconnecting
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=8)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        
+        # Auth header is set on the session once rather than merged per call
         if self.api_key:
-            self.headers["X-API-Key"] = self.api_key
+            self._session.headers["X-API-Key"] = self.api_key
+        self.headers = self._session.headers
+        
+        # Cleared on the first 404 from a server that predates /exec_and_get
+        self._exec_and_get_supported = True
+        
+        # path -> (etag, content) for conditional re-reads, in LRU order
+        self._file_cache: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
     
     def _request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
         """Make an HTTP request to the server."""
         url = f"{self.server_url}{endpoint}"
         kwargs.setdefault('timeout', self.timeout)
-        kwargs.setdefault('headers', {}).update(self.headers)
+        if 'json' in kwargs:
+            # Encode with orjson straight to bytes instead of stdlib json
+            kwargs['data'] = orjson.dumps(kwargs.pop('json'))
+            kwargs['headers'] = {**kwargs.get('headers', {}), 'Content-Type': 'application/json'}
         
-        response = requests.request(method, url, **kwargs)
+        try:
+            response = self._session.request(method, url, **kwargs)
+        except requests.ConnectionError as e:
+            # A pooled socket may have been closed by a server restart or
+            # idle timeout; retry idempotent requests once on a fresh connection
+            if method.upper() not in self.RETRY_METHODS:
+                raise
+            logger.warning("Retrying %s %s after connection error: %s", method, endpoint, e)
+            response = self._session.request(method, url, **kwargs)
         response.raise_for_status()
         return response
     
+    @staticmethod
+    def _json(response: requests.Response) -> Any:
+        """Decode a JSON response body with orjson."""
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError as e:
+            # Keep the requests exception type callers already handle
+            raise requests.exceptions.InvalidJSONError(str(e), response=response)
+    
     def ping(self) -> bool:
         """Check if the server is reachable."""
         try:
             resp = self._request("GET", "/status")
-            return resp.json().get("status") == "ready"
+            return self._json(resp).get("status") == "ready"
         except Exception:
             return False
     
     def get_status(self) -> Dict:
         """Get server status and file index info."""
         resp = self._request("GET", "/status")
-        return resp.json()
+        return self._json(resp)
     
     def exec_code(self, code: str) -> Dict[str, Any]:
         """
@@ -76,7 +122,7 @@ class RemoteSandbox:
         """
         try:
             resp = self._request("POST", "/execute", json={"code": code})
-            return resp.json()
+            return self._json(resp)
         except requests.RequestException as e:
             return {
                 "success": False,
@@ -88,34 +134,132 @@ class RemoteSandbox:
         """Get a variable's value from the sandbox."""
         try:
             resp = self._request("POST", "/get_var", json={"name": name})
-            data = resp.json()
+            data = self._json(resp)
             if data.get("success"):
                 return data.get("value")
             return None
         except Exception:
             return None
     
+    def exec_and_get(self, code: str, name: str) -> Tuple[Dict[str, Any], Optional[Any]]:
+        """
+        Execute code, then read a variable, in a single request.
+        
+        Args:
+            code: Python code to execute
+            name: Variable to read after execution
+        
+        Returns:
+            Tuple of (exec_code()-style result dict, variable value or None)
+        
+        Servers without /exec_and_get get the two separate requests instead.
+        """
+        if not self._exec_and_get_supported:
+            return self.exec_code(code), self.get_variable(name)
+        
+        try:
+            resp = self._request("POST", "/exec_and_get", json={"code": code, "name": name})
+            data = self._json(resp)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                # Older server: the route is missing, so nothing ran yet
+                self._exec_and_get_supported = False
+                return self.exec_and_get(code, name)
+            return {
+                "success": False,
+                "output": "",
+                "error": f"Request failed: {e}"
+            }, None
+        except requests.RequestException as e:
+            return {
+                "success": False,
+                "output": "",
+                "error": f"Request failed: {e}"
+            }, None
+        
+        result = {k: data.get(k) for k in ("success", "output", "error")}
+        return result, data.get("value") if data.get("found") else None
+    
     def list_files(self, pattern: str = "*") -> List[str]:
         """List files in the sandbox."""
         try:
             resp = self._request("GET", f"/files?pattern={pattern}")
-            return resp.json().get("files", [])
+            return self._json(resp).get("files", [])
         except Exception:
             return []
     
     def read_file(self, path: str) -> Optional[str]:
-        """Read a file from the sandbox."""
+        """
+        Read a file from the sandbox.
+        
+        Recently read files are revalidated with their ETag, so an
+        unchanged file costs a bodiless 304 instead of a full transfer.
+        """
+        cached = self._file_cache.get(path)
+        # Ask for the bytes uncompressed so the server can sendfile() them
+        # instead of gzipping the stream
+        headers = {"Accept-Encoding": "identity"}
+        if cached:
+            headers["If-None-Match"] = cached[0]
         try:
-            resp = self._request("GET", f"/file/{path}")
-            return resp.json().get("content")
+            resp = self._request("GET", f"/file/{path}", params={"raw": 1}, headers=headers)
         except Exception:
             return None
+        
+        if resp.status_code == 304 and cached:
+            self._file_cache.move_to_end(path)
+            return cached[1]
+        
+        if resp.headers.get("Content-Type", "").startswith("application/json"):
+            # Servers without ?raw=1 support still send the JSON envelope
+            try:
+                content = self._json(resp).get("content")
+            except requests.RequestException:
+                return None
+            if content is None:
+                return None
+        else:
+            content = resp.content.decode("utf-8", errors="replace")
+        etag = resp.headers.get("ETag")
+        if etag:
+            self._file_cache[path] = (etag, content)
+            self._file_cache.move_to_end(path)
+            while len(self._file_cache) > self.FILE_CACHE_SIZE:
+                self._file_cache.popitem(last=False)
+        return content
+    
+    def bulk_read(self, paths: List[str]) -> Dict[str, Dict[str, Optional[str]]]:
+        """
+        Read several files from the sandbox in one round-trip.
+        
+        Returns:
+            Dict mapping each path to {"content": ..., "error": ...};
+            empty if the request itself fails
+        """
+        if not paths:
+            return {}
+        try:
+            resp = self._request("POST", "/bulk_read", json={"paths": list(paths)})
+            return self._json(resp).get("results", {})
+        except Exception:
+            return {}
+    
+    def search_files(self, pattern: str, file_pattern: str = "*") -> List[Dict]:
+        """Search files in the sandbox for a regex pattern."""
+        try:
+            resp = self._request(
+                "GET", "/search",
+                params={"pattern": pattern, "file_pattern": file_pattern}
+            )
+            return self._json(resp).get("matches", [])
+        except Exception:
+            return []
     
     def reindex(self) -> int:
         """Reindex the data directory."""
         try:
             resp = self._request("POST", "/reindex")
-            return resp.json().get("files_indexed", 0)
+            return self._json(resp).get("files_indexed", 0)
         except Exception:
             return 0
     
@@ -123,7 +267,7 @@ class RemoteSandbox:
         """Reset the sandbox namespace."""
         try:
             resp = self._request("POST", "/reset")
-            return resp.json().get("status") == "reset"
+            return self._json(resp).get("status") == "reset"
         except Exception:
             return False
     
@@ -154,9 +298,13 @@ class RemoteSandbox:
         """
         return self.ping()
     
+    def close(self):
+        """Close pooled HTTP connections."""
+        self._session.close()
+    
     def stop(self):
-        """No-op for remote sandbox (server continues running)."""
-        pass
+        """Release the HTTP session (the server itself keeps running)."""
+        self.close()
     
     def __enter__(self):
         return self
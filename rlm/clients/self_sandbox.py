@@ -5,11 +5,37 @@ In-process sandbox for sub-agents running inside the container.
 Executes code directly in the shared global namespace without network calls.
 """
 
-import io
-import json
-import traceback
-from typing import Dict, Any, Optional, Callable
-from contextlib import redirect_stdout, redirect_stderr
+import itertools
+from typing import Dict, Any, Optional, Callable, Tuple
+
+from ..execution import MAX_OUTPUT_SIZE, OUTPUT_HARD_LIMIT, TRACEBACK_LIMIT, run_code
+
+
+_JSON_SCALARS = (str, int, float, bool, type(None))
+_JSON_SAMPLE = 64  # container items inspected per level
+_JSON_MAX_DEPTH = 6
+
+
+def _is_json_safe(value: Any, depth: int = 0) -> bool:
+    """
+    Cheaply check whether a value looks JSON-serializable.
+    
+    Only the first _JSON_SAMPLE items of each container are inspected, to
+    at most _JSON_MAX_DEPTH levels, so the cost doesn't grow with the
+    size of the value the way a full json.dumps() probe does.
+    """
+    if isinstance(value, _JSON_SCALARS):
+        return True
+    if depth >= _JSON_MAX_DEPTH:
+        return False
+    if isinstance(value, (list, tuple)):
+        return all(_is_json_safe(item, depth + 1) for item in value[:_JSON_SAMPLE])
+    if isinstance(value, dict):
+        return all(
+            isinstance(key, _JSON_SCALARS) and _is_json_safe(item, depth + 1)
+            for key, item in itertools.islice(value.items(), _JSON_SAMPLE)
+        )
+    return False
 
 
 class SelfSandbox:
@@ -22,7 +48,10 @@ class SelfSandbox:
     to share state with the parent execution context.
     """
     
-    MAX_OUTPUT_SIZE = 50000  # characters
+    # Limits are shared with the sandbox server (see rlm.execution)
+    MAX_OUTPUT_SIZE = MAX_OUTPUT_SIZE
+    OUTPUT_HARD_LIMIT = OUTPUT_HARD_LIMIT
+    TRACEBACK_LIMIT = TRACEBACK_LIMIT
     
     def __init__(
         self,
@@ -43,10 +72,11 @@ class SelfSandbox:
         self.file_index = file_index
         self.helper_functions = helper_functions or {}
         
-        # Ensure helper functions are in namespace
+        # Ensure helper functions are in namespace. Values are bound by
+        # reference, so a shared namespace (and its context) is never copied
+        # and names the caller already defined win
         for name, func in self.helper_functions.items():
-            if name not in self.namespace:
-                self.namespace[name] = func
+            self.namespace.setdefault(name, func)
     
     def exec_code(self, code: str, timeout: float = 120) -> Dict[str, Any]:
         """
@@ -59,32 +89,7 @@ class SelfSandbox:
         Returns:
             Dict with 'success', 'output', and 'error' keys
         """
-        stdout_capture = io.StringIO()
-        stderr_capture = io.StringIO()
-        
-        try:
-            with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
-                exec(code, self.namespace)
-            
-            stdout = stdout_capture.getvalue()
-            stderr = stderr_capture.getvalue()
-            
-            # Truncate if too long
-            if len(stdout) > self.MAX_OUTPUT_SIZE:
-                stdout = stdout[:self.MAX_OUTPUT_SIZE] + \
-                         f"\n... [Truncated at {self.MAX_OUTPUT_SIZE} chars]"
-            
-            return {
-                "success": True,
-                "output": stdout,
-                "error": stderr if stderr else None
-            }
-        except Exception as e:
-            return {
-                "success": False,
-                "output": stdout_capture.getvalue(),
-                "error": traceback.format_exc()
-            }
+        return run_code(code, self.namespace)
     
     def get_variable(self, name: str) -> Optional[Any]:
         """
@@ -101,12 +106,21 @@ class SelfSandbox:
         
         value = self.namespace[name]
         
-        # Try to make it JSON-serializable
-        try:
-            json.dumps(value)
+        # Return JSON-friendly values as-is, anything else as its repr
+        if _is_json_safe(value):
             return value
-        except (TypeError, ValueError):
-            return repr(value)
+        return repr(value)
+    
+    def exec_and_get(self, code: str, name: str) -> Tuple[Dict[str, Any], Optional[Any]]:
+        """
+        Execute code, then read a variable.
+        
+        Mirrors RemoteSandbox.exec_and_get() so the agent can use either.
+        
+        Returns:
+            Tuple of (exec_code() result, get_variable() value)
+        """
+        return self.exec_code(code), self.get_variable(name)
     
     def ping(self) -> bool:
         """Always returns True - in-process sandbox is always ready."""
@@ -0,0 +1,139 @@
+"""
+Code Execution for RLM Engine.
+
+Runs snippets in a namespace with bounded output capture. Shared by the
+sandbox server and the in-process SelfSandbox so both behave the same.
+"""
+
+import io
+import functools
+import traceback
+from typing import Dict, Any, List, Optional, Tuple
+from contextlib import redirect_stdout, redirect_stderr
+
+
+MAX_OUTPUT_SIZE = 50000  # characters
+OUTPUT_HARD_LIMIT = 10 * MAX_OUTPUT_SIZE  # stop execution past this much output beyond the cap
+TRACEBACK_LIMIT = 20  # innermost frames kept in error tracebacks
+
+
+class OutputLimitExceeded(Exception):
+    """Raised when executed code writes far more output than can be kept."""
+
+
+class BoundedStringIO(io.TextIOBase):
+    """
+    Text sink that keeps at most `cap` characters.
+    
+    Writes past the cap are counted but dropped, so memory stays bounded
+    no matter how much the code prints. A single oversized write is just
+    truncated; once `limit` characters have been written after the buffer
+    was already full, OutputLimitExceeded is raised to stop runaway loops.
+    """
+    
+    def __init__(self, cap: int, limit: Optional[int] = None):
+        super().__init__()
+        self.cap = cap
+        self.limit = limit
+        self.written = 0
+        self.overflow = 0  # characters written once the buffer was full
+        self._kept = 0
+        self._chunks: List[str] = []
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, s: str) -> int:
+        n = len(s)
+        self.written += n
+        if self._kept < self.cap:
+            part = s[:self.cap - self._kept]
+            self._chunks.append(part)
+            self._kept += len(part)
+            return n
+        self.overflow += n
+        if self.limit is not None and self.overflow > self.limit:
+            raise OutputLimitExceeded(
+                f"Output limit exceeded ({self.written} chars written)"
+            )
+        return n
+    
+    @property
+    def truncated(self) -> bool:
+        return self.written > self.cap
+    
+    def getvalue(self) -> str:
+        return "".join(self._chunks)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_code(code: str) -> Tuple[Any, bool]:
+    """
+    Compile a code snippet, reusing the code object for repeated snippets.
+    
+    Single-line expressions are compiled in eval mode so their value can
+    be echoed like an interactive prompt. SyntaxError propagates to the
+    caller and is not cached.
+    
+    Returns:
+        Tuple of (code object, is_expression)
+    """
+    if '\n' not in code.strip():
+        try:
+            return compile(code, "<repl>", "eval"), True
+        except SyntaxError:
+            pass
+    return compile(code, "<repl>", "exec"), False
+
+
+def run_code(code: str, namespace: Dict[str, Any]) -> Dict:
+    """
+    Execute code in a namespace, capturing its output.
+    
+    A single-line expression has the repr() of its value (unless None)
+    printed, as an interactive prompt would.
+    
+    Args:
+        code: Python code to execute
+        namespace: Globals the code runs in (modified in place)
+    
+    Returns:
+        Dict with 'success', 'output', and 'error' keys
+    """
+    stdout_capture = BoundedStringIO(MAX_OUTPUT_SIZE, limit=OUTPUT_HARD_LIMIT)
+    stderr_capture = BoundedStringIO(MAX_OUTPUT_SIZE, limit=OUTPUT_HARD_LIMIT)
+    
+    try:
+        code_obj, is_expression = compile_code(code)
+        with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
+            if is_expression:
+                value = eval(code_obj, namespace)
+                if value is not None:
+                    print(repr(value))
+            else:
+                exec(code_obj, namespace)
+        
+        stdout = stdout_capture.getvalue()
+        stderr = stderr_capture.getvalue()
+        
+        if stdout_capture.truncated:
+            stdout += f"\n... [Truncated at {MAX_OUTPUT_SIZE} chars]"
+        
+        return {
+            "success": True,
+            "output": stdout,
+            "error": stderr if stderr else None
+        }
+    except OutputLimitExceeded as e:
+        return {
+            "success": False,
+            "output": stdout_capture.getvalue() + f"\n... [Truncated at {MAX_OUTPUT_SIZE} chars]",
+            "error": f"{e}; execution stopped."
+        }
+    except Exception as e:
+        tb = traceback.TracebackException.from_exception(e, limit=-TRACEBACK_LIMIT)
+        return {
+            "success": False,
+            "output": stdout_capture.getvalue(),
+            "error": "".join(tb.format())
+        }
@@ -9,6 +9,18 @@ import re
 from typing import Optional, Tuple, List
 
 
+# Patterns used on every LLM turn, compiled once at import
+_PYTHON_BLOCK_RE = re.compile(r'```python\s*\n(.*?)```', re.DOTALL)
+_GENERIC_BLOCK_RE = re.compile(r'```\s*\n(.*?)```', re.DOTALL)
+_FINAL_VAR_RE = re.compile(r'(?:^|\s)FINAL_VAR\((\w+)\)', re.MULTILINE)
+# FINAL_VAR(...) or FINAL(...), whichever comes first, in one scan
+_FINAL_ANY_RE = re.compile(
+    r'(?:^|\s)(?:FINAL_VAR\((?P<var>\w+)\)|FINAL\((?P<ans>[^)]+)\))',
+    re.MULTILINE | re.DOTALL
+)
+_EXCESS_NEWLINES_RE = re.compile(r'\n{3,}')
+
+
 def extract_code_blocks(response: str) -> List[str]:
     """
     Extract Python code blocks from a response.
@@ -19,16 +31,16 @@ def extract_code_blocks(response: str) -> List[str]:
     Returns:
         List of code block contents
     """
-    # Match ```python ... ``` blocks
-    pattern = r'```python\s*\n(.*?)```'
-    matches = re.findall(pattern, response, re.DOTALL)
-    
-    # Also try generic code blocks if no python-specific ones found
-    if not matches:
-        pattern = r'```\s*\n(.*?)```'
-        matches = re.findall(pattern, response, re.DOTALL)
-    
-    return [block.strip() for block in matches]
+    # No fence at all means no blocks; skip the regex scans
+    if "```" not in response:
+        return []
+    
+    # Match ```python ... ``` blocks, falling back to generic code blocks
+    # if no python-specific ones are found
+    return (
+        [m.group(1).strip() for m in _PYTHON_BLOCK_RE.finditer(response)]
+        or [m.group(1).strip() for m in _GENERIC_BLOCK_RE.finditer(response)]
+    )
 
 
 def extract_first_code_block(response: str) -> Optional[str]:
@@ -41,8 +53,12 @@ def extract_first_code_block(response: str) -> Optional[str]:
     Returns:
         Code block content or None
     """
-    blocks = extract_code_blocks(response)
-    return blocks[0] if blocks else None
+    if "```" not in response:
+        return None
+    
+    # Stop at the first match instead of collecting every block
+    match = _PYTHON_BLOCK_RE.search(response) or _GENERIC_BLOCK_RE.search(response)
+    return match.group(1).strip() if match else None
 
 
 def detect_final_answer(response: str) -> Tuple[bool, Optional[str], Optional[str]]:
@@ -64,21 +80,30 @@ def detect_final_answer(response: str) -> Tuple[bool, Optional[str], Optional[st
         - answer_type: 'FINAL' or 'FINAL_VAR' or None
         - answer_content: The answer content or variable name
     """
-    # Check for FINAL_VAR(...) pattern first (more specific)
-    # Must be at start of line or after whitespace, immediately followed by (
-    final_var_match = re.search(r'(?:^|\s)FINAL_VAR\((\w+)\)', response, re.MULTILINE)
-    if final_var_match:
-        return True, 'FINAL_VAR', final_var_match.group(1)
-    
-    # Check for FINAL(...) pattern
-    # Must be at start of line or after whitespace, immediately followed by (
-    # The opening paren must immediately follow FINAL (no space)
-    final_match = re.search(r'(?:^|\s)FINAL\(([^)]+)\)', response, re.MULTILINE | re.DOTALL)
-    if final_match:
-        content = final_match.group(1).strip()
-        # Make sure it's not empty
-        if content:
-            return True, 'FINAL', content
+    # Cheap substring test covers the common no-answer turn
+    if 'FINAL' not in response:
+        return False, None, None
+    
+    # Both forms must be at start of line or after whitespace, with the
+    # opening paren immediately after the keyword (no space)
+    match = _FINAL_ANY_RE.search(response)
+    if not match:
+        return False, None, None
+    
+    if match.group('var'):
+        return True, 'FINAL_VAR', match.group('var')
+    
+    # FINAL_VAR(...) takes priority even if it appears after FINAL(...);
+    # anything before this match was already ruled out by the search
+    if 'FINAL_VAR(' in response[match.start('ans'):]:
+        final_var_match = _FINAL_VAR_RE.search(response, match.start('ans'))
+        if final_var_match:
+            return True, 'FINAL_VAR', final_var_match.group(1)
+    
+    content = match.group('ans').strip()
+    # Make sure it's not empty
+    if content:
+        return True, 'FINAL', content
     
     return False, None, None
 
@@ -97,13 +122,10 @@ def truncate_output(output: str, max_chars: int = 2000) -> str:
     if len(output) <= max_chars:
         return output
     
-    # Keep first portion and indicate truncation
-    truncated = output[:max_chars]
-    
-    # Try to truncate at a natural boundary (newline)
-    last_newline = truncated.rfind('\n')
-    if last_newline > max_chars * 0.7:  # If there's a newline in the last 30%
-        truncated = truncated[:last_newline]
+    # Try to truncate at a natural boundary (newline) in the last 30%,
+    # searching only that window and slicing the output once
+    cut = output.rfind('\n', int(max_chars * 0.7) + 1, max_chars)
+    truncated = output[:cut if cut != -1 else max_chars]
     
     return truncated + f"\n\n... [Output truncated. Total length: {len(output)} chars]"
 
@@ -150,7 +172,7 @@ def clean_response_for_display(response: str, max_length: int = 500) -> str:
         Cleaned and possibly truncated response
     """
     # Remove excessive whitespace
-    cleaned = re.sub(r'\n{3,}', '\n\n', response)
+    cleaned = _EXCESS_NEWLINES_RE.sub('\n\n', response)
     cleaned = cleaned.strip()
     
     if len(cleaned) <= max_length:
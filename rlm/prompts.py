@@ -4,14 +4,28 @@ RLM System Prompts.
 Contains the system prompt templates for different modes.
 """
 
+import functools
+import string
+from typing import Any, Callable, Dict, Optional, Tuple
+
+__all__ = [
+    "RLM_FILE_PROMPT",
+    "RLM_DIRECTORY_PROMPT",
+    "format_file_prompt",
+    "format_directory_prompt",
+    "format_system_prompt",
+]
+
+# Runtime values sit at the end of each template so everything before them
+# is a byte-identical prefix across runs (reusable by provider prompt caches)
+
 # Single file mode prompt
 RLM_FILE_PROMPT = '''You are an AI assistant that analyzes documents using Python code execution.
 
 ## The Document is Already Loaded
 
-The document is in the `context` variable.
-- **Size**: {context_length} characters (~{context_words} words)
-- **Type**: {context_type}
+The document is in the `context` variable (`context_bytes` holds the raw bytes).
+Its size and type are listed at the end of this prompt.
 
 ## Workflow
 
@@ -26,6 +40,11 @@ When you have the answer, write this as PLAIN TEXT (not code):
 FINAL(Your complete answer with specific findings from your analysis)
 
 **IMPORTANT**: FINAL() is NOT Python code. Write it as regular text outside any code blocks.
+
+## Document
+
+- **Size**: {context_length} characters (~{context_words} words)
+- **Type**: {context_type}
 '''
 
 
@@ -39,14 +58,15 @@ RLM_DIRECTORY_PROMPT = '''You are an AI assistant that analyzes codebases using
 print(list_files("*.py"))       # List files matching pattern
 content = read_file("file.py")  # Read a file's content
 matches = search_files("TODO")  # Search for pattern in all files
+contents = read_files_batch(["a.py", "b.py"])          # Read several files at once
+hits = search_files_many(["TODO", "FIXME"], "*.py")    # Several patterns, one pass
 
 # Recursive sub-agents
 result = llm_query("Summarize this code")  # Spawn a sub-agent
+results = llm_query_many([p1, p2, p3])     # Run several sub-agents concurrently
 ```
 
-**IMPORTANT**: Always use `print()` to see results!
-
-## Files Indexed: {file_count}
+**IMPORTANT**: Use `print()` to see results! Only a block that is a single expression, like `list_files()`, has its value echoed.
 
 ## Recursive Sub-Agents
 
@@ -62,7 +82,7 @@ print(summary)
 Sub-agents have full tool access (can read files, execute code). Use them for:
 - Summarizing individual files before aggregating
 - Breaking down complex analysis into steps
-- Parallel analysis of different components
+- Parallel analysis of different components (prefer `llm_query_many` over a loop)
 
 ## Example Session
 
@@ -88,28 +108,93 @@ FINAL(Your comprehensive answer based on the analysis)
 
 ## CRITICAL RULES
 
-1. **Always use print()** - `list_files()` alone shows nothing!
+1. **Use print()** - inside multi-line code, values are not shown unless printed
 2. **FINAL() is NOT code** - Write it as plain text outside code blocks
 3. **Use llm_query() for complex subtasks** - Sub-agents can help with detailed analysis
+
+## Files Indexed: {file_count}
 '''
 
 
+def _compile_template(template: str, params: Tuple[str, ...]) -> Callable[..., str]:
+    """
+    Compile a str.format template into a function that renders it.
+    
+    The template is parsed once and rewritten as the body of an f-string,
+    so each render is straight-line BUILD_STRING bytecode with none of
+    str.format's parsing or field lookup. The function takes params as
+    keyword-only arguments; every field in the template must be one.
+    """
+    body = []
+    for literal, field_name, spec, conversion in string.Formatter().parse(template):
+        # Literals come back unescaped; re-escape braces for the f-string
+        body.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field_name is not None:
+            if field_name not in params or spec or conversion:
+                raise ValueError(f"Unsupported template field: {field_name!r}")
+            body.append("{" + field_name + "}")
+    
+    source = f"def _render(*, {', '.join(params)}):\n    return f{''.join(body)!r}\n"
+    namespace: Dict[str, Any] = {}
+    exec(compile(source, "<rlm-prompt>", "exec"), namespace)
+    return namespace["_render"]
+
+
+# Templates are compiled once at import instead of parsed on every call
+_render_file_prompt = _compile_template(
+    RLM_FILE_PROMPT, ("context_length", "context_words", "context_type")
+)
+_render_directory_prompt = _compile_template(
+    RLM_DIRECTORY_PROMPT, ("file_count", "context_type")
+)
+
+
+@functools.lru_cache(maxsize=128)
+def format_file_prompt(
+    context_length: int = 0,
+    context_type: str = "text document",
+    context_words: Optional[int] = None
+) -> str:
+    """
+    Format the single-file system prompt (memoized).
+    
+    context_words is the document's word count if the caller has counted
+    it; otherwise it is estimated from context_length.
+    """
+    if context_words is None:
+        context_words = context_length // 5
+    return _render_file_prompt(
+        context_length=context_length,
+        context_words=context_words,
+        context_type=context_type
+    )
+
+
+@functools.lru_cache(maxsize=128)
+def format_directory_prompt(
+    file_count: int = 0,
+    context_type: str = "text document"
+) -> str:
+    """Format the directory system prompt (memoized)."""
+    return _render_directory_prompt(
+        file_count=file_count,
+        context_type=context_type
+    )
+
+
 def format_system_prompt(
     context_length: int = 0,
     context_type: str = "text document",
     file_count: int = 0,
-    is_directory: bool = False
+    is_directory: bool = False,
+    context_words: Optional[int] = None
 ) -> str:
-    """Format the system prompt."""
+    """
+    Format the system prompt for either mode.
+    
+    Kept for callers that pick the mode at runtime; code that knows its
+    mode can call format_file_prompt or format_directory_prompt directly.
+    """
     if is_directory:
-        return RLM_DIRECTORY_PROMPT.format(
-            file_count=file_count,
-            context_type=context_type
-        )
-    else:
-        words = context_length // 5
-        return RLM_FILE_PROMPT.format(
-            context_length=context_length,
-            context_words=words,
-            context_type=context_type
-        )
+        return format_directory_prompt(file_count, context_type)
+    return format_file_prompt(context_length, context_type, context_words)
@@ -14,6 +14,9 @@ Prerequisites:
 import os
 import sys
 import time
+import shutil
+import tempfile
+import functools
 
 # Add parent to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -22,6 +25,12 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+@functools.lru_cache(maxsize=1)
+def docker_available() -> bool:
+    """Check for the docker CLI once, without spawning a process."""
+    return shutil.which("docker") is not None
+
+
 def test_imports():
     """Test that all modules can be imported."""
     print("=" * 60)
@@ -96,10 +105,108 @@ def test_self_sandbox():
     assert value == 42, f"Variable not persisted: {value}"
     print("✓ Variable persistence works")
     
+    # Test 4: Runaway output is stopped instead of growing without bound
+    result = sandbox.exec_code("while True: print('x' * 100)")
+    assert not result['success'], "Runaway output was not stopped"
+    assert len(result['output']) < 2 * sandbox.MAX_OUTPUT_SIZE, "Output not capped"
+    print("✓ Output limit stops runaway loops")
+    
+    # Test 5: One oversized print is truncated and the code keeps running
+    result = sandbox.exec_code("big = 'a' * 600_000\nprint(big)\ndone = True")
+    assert result['success'], f"Oversized print failed: {result['error']}"
+    assert "Truncated" in result['output'], "Oversized print not truncated"
+    assert namespace.get('done') is True, "Code after the print did not run"
+    print("✓ Oversized single print is truncated")
+    
+    # Test 6: A lone expression is echoed, as on the sandbox server
+    result = sandbox.exec_code("list_files('*')")
+    assert result['success'] and 'test.txt' in result['output'], f"Expression not echoed: {result}"
+    assert sandbox.exec_code("my_var = 7")['output'] == "", "Statement produced output"
+    print("✓ Single-line expressions are echoed")
+    
     print("\nSelfSandbox tests passed!\n")
     return True
 
 
+def test_parser():
+    """Test code block extraction and final answer detection."""
+    print("=" * 60)
+    print("TEST: Response Parser")
+    print("=" * 60)
+    
+    from rlm.parser import extract_first_code_block, detect_final_answer
+    
+    # Test 1: First python block wins over generic blocks
+    response = "```\nplain\n```\n```python\nx = 1\n```\n```python\ny = 2\n```"
+    assert extract_first_code_block(response) == "x = 1", "Wrong code block"
+    assert extract_first_code_block("no code here") is None, "False code block"
+    print("✓ Code block extraction works")
+    
+    # Test 2: FINAL and FINAL_VAR detection
+    assert detect_final_answer("FINAL(42)") == (True, 'FINAL', '42')
+    assert detect_final_answer("done\nFINAL_VAR(result)") == (True, 'FINAL_VAR', 'result')
+    assert detect_final_answer("FINAL ANALYSIS: FINALLY(x)") == (False, None, None)
+    assert detect_final_answer("FINAL(   )") == (False, None, None)
+    print("✓ Final answer detection works")
+    
+    # Test 3: FINAL_VAR takes priority even when it comes later
+    assert detect_final_answer("FINAL(draft)\nFINAL_VAR(answer)") == (True, 'FINAL_VAR', 'answer')
+    print("✓ FINAL_VAR priority preserved")
+    
+    print("\nParser tests passed!\n")
+    return True
+
+
+def test_search_files():
+    """Test the sandbox server's search_files() line semantics."""
+    print("=" * 60)
+    print("TEST: Server search_files")
+    print("=" * 60)
+    
+    try:
+        import repl_server
+    except ImportError as e:
+        print(f"  Skipping: server dependencies not installed ({e})\n")
+        return True
+    
+    with tempfile.TemporaryDirectory() as data_dir:
+        with open(os.path.join(data_dir, "a.py"), "w") as f:
+            f.write("class A:\n    pass\n\ndef foo():\n    pass\n")
+        with open(os.path.join(data_dir, "b.txt"), "w", newline="") as f:
+            f.write("hello\r\nworld\rold mac\nwörld\n")
+        
+        old_data_dir = repl_server.DATA_DIR
+        repl_server.DATA_DIR = data_dir
+        try:
+            repl_server.index_directory(data_dir)
+            
+            def lines(pattern):
+                return [(m['file'], m['line']) for m in repl_server.search_files(pattern)]
+            
+            # Test 1: Regex classes never match across line breaks
+            assert lines(r'^\s*def ') == [("a.py", 4)], "\\s matched across lines"
+            assert lines(r'\s+pass') == [("a.py", 2), ("a.py", 5)], "Wrong \\s+pass lines"
+            assert lines(r'[^x]+A') == [("a.py", 1)], "[^x] matched across lines"
+            print("✓ Regex matches stay within one line")
+            
+            # Test 2: Lone \r and \r\n count as line breaks, as in read_file()
+            assert repl_server.search_files('old') == [
+                {'file': 'b.txt', 'line': 3, 'content': 'old mac'}
+            ], "Literal search ignored universal newlines"
+            assert lines(r'world$') == [("b.txt", 2)], "$ did not match before \\r"
+            print("✓ Universal newlines respected")
+            
+            # Test 3: Non-ASCII character classes match
+            assert lines(r'w[ö]rld') == [("b.txt", 4)], "Non-ASCII class did not match"
+            print("✓ Unicode patterns work")
+        finally:
+            repl_server.DATA_DIR = old_data_dir
+            repl_server.index_directory(old_data_dir)
+    
+    print("\nsearch_files tests passed!\n")
+    return True
+
+
 def test_docker_sandbox_build():
     """Test that Docker sandbox can build the image."""
     print("=" * 60)
@@ -111,14 +218,7 @@ def test_docker_sandbox_build():
     sandbox = DockerSandbox(verbose=True)
     
     # Check if image exists or build it
-    import subprocess
-    result = subprocess.run(
-        ["docker", "images", "-q", "rlm-sandbox"],
-        capture_output=True,
-        text=True
-    )
-    
-    if result.stdout.strip():
+    if DockerSandbox.image_exists():
         print("✓ Docker image already exists")
     else:
         print("Building Docker image (this may take a minute)...")
@@ -134,12 +234,8 @@ def test_docker_sandbox_build():
     return True
 
 
-def test_docker_sandbox_start():
-    """Test that Docker sandbox can start and respond."""
-    print("=" * 60)
-    print("TEST: Docker Sandbox Start & HTTP Communication")
-    print("=" * 60)
-    
+def start_docker_sandbox():
+    """Start one Docker sandbox (the rlm directory as data) to share across tests."""
     from rlm.clients.docker_sandbox import DockerSandbox
     
     # Use the rlm directory as test data
@@ -153,42 +249,46 @@ def test_docker_sandbox_start():
         verbose=True
     )
     
-    try:
-        print("Starting container...")
-        if not sandbox.start():
-            print(" Failed to start container")
-            return False
-        print("✓ Container started")
-        
-        # Test ping
-        if sandbox.ping():
-            print("✓ HTTP ping successful")
-        else:
-            print(" HTTP ping failed")
-            return False
-        
-        # Test code execution
-        result = sandbox.exec_code("print('Hello from sandbox!')")
-        if result['success'] and 'Hello from sandbox' in result['output']:
-            print("✓ Code execution works")
-        else:
-            print(f" Code execution failed: {result}")
-            return False
-        
-        # Test list_files
-        result = sandbox.exec_code("files = list_files('*.py')\nprint(files)")
-        if result['success']:
-            print(f"✓ list_files() works: {result['output'][:100]}...")
-        else:
-            print(f" list_files failed: {result['error']}")
-            return False
-        
-        print("\n Docker sandbox tests passed!\n")
-        return True
-        
-    finally:
-        print("Stopping container...")
+    print("Starting container...")
+    if not sandbox.start():
+        print(" Failed to start container")
         sandbox.stop()
+        return None
+    print("✓ Container started")
+    return sandbox
+
+
+def test_docker_sandbox_start(sandbox):
+    """Test that the started Docker sandbox responds."""
+    print("=" * 60)
+    print("TEST: Docker Sandbox Start & HTTP Communication")
+    print("=" * 60)
+    
+    # Test ping
+    if sandbox.ping():
+        print("✓ HTTP ping successful")
+    else:
+        print(" HTTP ping failed")
+        return False
+    
+    # Test code execution
+    result = sandbox.exec_code("print('Hello from sandbox!')")
+    if result['success'] and 'Hello from sandbox' in result['output']:
+        print("✓ Code execution works")
+    else:
+        print(f" Code execution failed: {result}")
+        return False
+    
+    # Test list_files
+    result = sandbox.exec_code("files = list_files('*.py')\nprint(files)")
+    if result['success']:
+        print(f"✓ list_files() works: {result['output'][:100]}...")
+    else:
+        print(f" list_files failed: {result['error']}")
+        return False
+    
+    print("\n Docker sandbox tests passed!\n")
+    return True
 
 
 def test_full_agent():
@@ -246,13 +346,27 @@ def main():
     # Test 2: SelfSandbox
     results.append(("SelfSandbox", test_self_sandbox()))
     
-    # Test 3: Docker build (optional - skip if no Docker)
-    try:
-        import subprocess
-        subprocess.run(["docker", "--version"], capture_output=True, check=True)
-        results.append(("Docker Build", test_docker_sandbox_build()))
-        results.append(("Docker Start", test_docker_sandbox_start()))
-    except Exception:
+    # Test 3: Parser
+    results.append(("Parser", test_parser()))
+    
+    # Test 4: Server search
+    results.append(("Search", test_search_files()))
+    
+    # Test 5: Docker build (optional - skip if no Docker)
+    # The container is started once and shared by every test that needs it
+    if docker_available():
+        built = test_docker_sandbox_build()
+        results.append(("Docker Build", built))
+        sandbox = start_docker_sandbox() if built else None
+        if sandbox is not None:
+            try:
+                results.append(("Docker Start", test_docker_sandbox_start(sandbox)))
+            finally:
+                print("Stopping container...")
+                sandbox.stop()
+        elif built:
+            results.append(("Docker Start", False))
+    else:
         print("  Docker not available, skipping Docker tests\n")
     
     # Summary